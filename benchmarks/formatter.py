@@ -0,0 +1,211 @@
+"""
+Measure how many records per second ColoredFormatter can format.
+
+Run from the repository root with ``python -m benchmarks.formatter``. Results can be
+saved with ``--save results.json`` and compared against later runs on the same
+machine with ``--compare results.json``, which exits with a non-zero status if any
+benchmark is slower than the saved result by more than ``--threshold``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import timeit
+import tracemalloc
+import typing
+
+import colorlog
+
+RECORDS = 50_000
+LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL)
+
+Benchmark = typing.Callable[[logging.LogRecord], typing.Any]
+
+
+def make_record(level: int, exc_info: typing.Any = None) -> logging.LogRecord:
+    """Create a record like the ones produced by ``logger.info("...", 1)``."""
+    return logging.LogRecord(
+        name="benchmark",
+        level=level,
+        pathname=__file__,
+        lineno=1,
+        msg="a message %s",
+        args=(1,),
+        exc_info=exc_info,
+    )
+
+
+def make_exc_info() -> typing.Any:
+    try:
+        raise RuntimeError("an exception")
+    except RuntimeError:
+        return sys.exc_info()
+
+
+def style_benchmarks() -> typing.Dict[str, Benchmark]:
+    return {
+        "style %": colorlog.ColoredFormatter(
+            "%(log_color)s%(levelname)-8s%(reset)s %(name)s %(message)s", style="%"
+        ).format,
+        "style {": colorlog.ColoredFormatter(
+            "{log_color}{levelname:<8}{reset} {name} {message}", style="{"
+        ).format,
+        "style $": colorlog.ColoredFormatter(
+            "${log_color}${levelname}${reset} ${name} ${message}", style="$"
+        ).format,
+    }
+
+
+def secondary_log_colors_benchmark() -> Benchmark:
+    names = ["key%d" % i for i in range(50)]
+    secondary_log_colors = {
+        name: {"DEBUG": "cyan", "INFO": "green", "ERROR": "bold_red"} for name in names
+    }
+    fmt = "".join("%%(%s_log_color)s%s " % (name, name) for name in names)
+    return colorlog.ColoredFormatter(
+        fmt + "%(message)s", secondary_log_colors=secondary_log_colors
+    ).format
+
+
+def level_formatter_benchmark() -> Benchmark:
+    return colorlog.LevelFormatter(
+        fmt={
+            "DEBUG": "%(log_color)s%(message)s (%(module)s:%(lineno)d)",
+            "INFO": "%(log_color)s%(message)s",
+            "WARNING": "%(log_color)sWRN: %(message)s (%(module)s:%(lineno)d)",
+            "ERROR": "%(log_color)sERR: %(message)s (%(module)s:%(lineno)d)",
+            "CRITICAL": "%(log_color)sCRT: %(message)s (%(module)s:%(lineno)d)",
+        }
+    ).format
+
+
+def asctime_benchmark() -> Benchmark:
+    return colorlog.ColoredFormatter(
+        "%(asctime)s %(log_color)s%(levelname)-8s%(reset)s %(message)s"
+    ).format
+
+
+def no_color_benchmark() -> Benchmark:
+    return colorlog.ColoredFormatter(no_color=True).format
+
+
+def exception_benchmark(**kwargs: typing.Any) -> Benchmark:
+    formatter = colorlog.ColoredFormatter(**kwargs)
+
+    def format_exception(record: logging.LogRecord) -> str:
+        # Formatter.format() caches the exception text on the record.
+        record.exc_text = None
+        return formatter.format(record)
+
+    return format_exception
+
+
+def fan_out_benchmark() -> Benchmark:
+    formatter = colorlog.ColoredFormatter(force_color=True)
+    views = [formatter.view(output) for output in ("colored", "plain", "stripped")]
+
+    def format_views(record: logging.LogRecord) -> typing.List[str]:
+        # ColoredFormatter.render() caches the rendered record on the record.
+        record.__dict__.pop("_colorlog_segments", None)
+        return [view.format(record) for view in views]
+
+    return format_views
+
+
+def basic_config_benchmark() -> Benchmark:
+    logging.root.handlers = []
+    colorlog.basicConfig(stream=open(os.devnull, "w"), level=logging.DEBUG)
+    return logging.root.handle
+
+
+def benchmarks() -> typing.Dict[str, typing.Tuple[Benchmark, typing.List]]:
+    records = [make_record(level) for level in LEVELS]
+    exc_records = [make_record(logging.ERROR, make_exc_info())]
+    return {
+        **{name: (b, records) for name, b in style_benchmarks().items()},
+        "secondary_log_colors": (secondary_log_colors_benchmark(), records),
+        "LevelFormatter": (level_formatter_benchmark(), records),
+        "asctime": (asctime_benchmark(), records),
+        "no color": (no_color_benchmark(), records),
+        "exception": (exception_benchmark(), exc_records),
+        "exception (cached)": (
+            exception_benchmark(exception_cache_size=64),
+            exc_records,
+        ),
+        "fan-out (3 views)": (fan_out_benchmark(), records),
+        "basicConfig": (basic_config_benchmark(), records),
+    }
+
+
+def records_per_second(benchmark: Benchmark, records: typing.List) -> float:
+    """Return the number of records per second the benchmark can format."""
+    number = max(1, RECORDS // len(records))
+
+    def run():
+        for record in records:
+            benchmark(record)
+
+    seconds = min(timeit.repeat(run, number=number, repeat=5))
+    return number * len(records) / seconds
+
+
+def bytes_per_record(benchmark: Benchmark, records: typing.List) -> float:
+    """Return the peak memory allocated while formatting a record."""
+    benchmark(records[0])
+    peaks = []
+    for record in records:
+        tracemalloc.start()
+        benchmark(record)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--save", metavar="FILE", help="save results to a file")
+    parser.add_argument("--compare", metavar="FILE", help="compare with saved results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="the fraction a benchmark can be slower by (default: 0.2)",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = []
+    print(
+        "%-22s %12s %14s %8s" % ("benchmark", "records/s", "peak bytes/rec", "change")
+    )
+    for name, (benchmark, records) in benchmarks().items():
+        rate = records_per_second(benchmark, records)
+        peak = bytes_per_record(benchmark, records)
+        results[name] = rate
+        change = ""
+        if name in baseline:
+            ratio = rate / baseline[name] - 1
+            change = "%+.1f%%" % (ratio * 100)
+            if ratio < -args.threshold:
+                failed.append(name)
+        print("%-22s %12.0f %14.0f %8s" % (name, rate, peak, change))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if failed:
+        print("Slower than %s: %s" % (args.compare, ", ".join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
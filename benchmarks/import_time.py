@@ -0,0 +1,45 @@
+"""
+Measure how long it takes to import colorlog, using ``python -X importtime``.
+
+Run from the repository root with ``python -m benchmarks.import_time``. Run it
+twice if bytecode isn't cached yet, or the results will include compile time.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import typing
+
+RUNS = 20
+
+
+def import_times() -> typing.Dict[str, typing.Tuple[int, int]]:
+    """Import colorlog in a new interpreter and return times for its modules."""
+    env = {**os.environ, "PYTHONPATH": os.getcwd()}
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import colorlog"],
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        self_us, cumulative_us, name = line.partition(":")[2].split("|")
+        if name.strip().startswith("colorlog") and self_us.strip().isdigit():
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    runs = [import_times() for _ in range(RUNS)]
+    print("%-24s %10s %12s" % ("module", "self (us)", "cumulative"))
+    for name in runs[-1]:
+        self_us = statistics.median(run[name][0] for run in runs)
+        cumulative_us = statistics.median(run[name][1] for run in runs)
+        print("%-24s %10.0f %12.0f" % (name, self_us, cumulative_us))
+
+
+if __name__ == "__main__":
+    main()
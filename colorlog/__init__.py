@@ -5,10 +5,13 @@ import warnings
 
 from colorlog.formatter import (
     ColoredFormatter,
+    FormatterView,
     LevelFormatter,
+    StripANSIFormatter,
     TTYColoredFormatter,
     default_log_colors,
 )
+from colorlog.structured import JSONFormatter, LogfmtFormatter
 from colorlog.wrappers import (
     CRITICAL,
     DEBUG,
@@ -16,10 +19,12 @@ from colorlog.wrappers import (
     FATAL,
     INFO,
     NOTSET,
+    ListenerProcess,
     StreamHandler,
     WARN,
     WARNING,
     basicConfig,
+    configure_worker,
     critical,
     debug,
     error,
@@ -41,10 +46,16 @@ __all__ = (
     "WARN",
     "WARNING",
     "ColoredFormatter",
+    "FormatterView",
+    "JSONFormatter",
     "LevelFormatter",
+    "ListenerProcess",
+    "LogfmtFormatter",
     "StreamHandler",
+    "StripANSIFormatter",
     "TTYColoredFormatter",
     "basicConfig",
+    "configure_worker",
     "critical",
     "debug",
     "default_log_colors",
@@ -6,7 +6,12 @@ http://en.wikipedia.org/wiki/ANSI_escape_code
 Uses colorama as an optional dependency to support color on Windows
 """
 
+import functools
+import os
+import re
 import sys
+import typing
+import weakref
 
 try:
     import colorama
@@ -16,20 +21,229 @@ else:
     if sys.platform == "win32":
         colorama.init(strip=False)
 
-__all__ = ("escape_codes", "parse_colors")
+__all__ = (
+    "display_width",
+    "escape_codes",
+    "parse_colors",
+    "register_style",
+    "set_color_depth",
+    "strip_ansi",
+    "strip_ansi_file",
+    "strip_ansi_lines",
+)
 
 
 # Returns escape codes from format codes
 def esc(*codes: int) -> str:
-    return "\033[" + ";".join(str(code) for code in codes) + "m"
+    return "\033[" + ";".join(map(str, codes)) + "m"
 
 
-escape_codes = {
-    "reset": esc(0),
-    "bold": esc(1),
-    "thin": esc(2),
+def _256_color(name: str) -> typing.Optional[str]:
+    """Return the escape code for a 256 color name (e.g. fg_123), or None."""
+    prefix, _, number = name.partition("_")
+    if prefix not in ("fg", "bg") or not number.isdecimal():
+        return None
+    code = int(number)
+    if code > 255 or str(code) != number:
+        return None
+    return esc(38 if prefix == "fg" else 48, 5, code)
+
+
+def _detect_color_depth() -> int:
+    """Guess how many bits of color the terminal supports from the environment."""
+    if os.environ.get("COLORTERM") in ("truecolor", "24bit"):
+        return 24
+    if "256" in os.environ.get("TERM", ""):
+        return 8
+    return 4
+
+
+# The number of bits of color used for RGB colors, see set_color_depth()
+color_depth = _detect_color_depth()
+
+# The channel values used by the 6x6x6 color cube in the 256 color palette
+_cube_levels = (0, 95, 135, 175, 215, 255)
+
+# The channel values of the 16 basic colors (as used by xterm) and their codes
+_basic_colors = {
+    (0, 0, 0): 30,
+    (205, 0, 0): 31,
+    (0, 205, 0): 32,
+    (205, 205, 0): 33,
+    (0, 0, 238): 34,
+    (205, 0, 205): 35,
+    (0, 205, 205): 36,
+    (229, 229, 229): 37,
+    (127, 127, 127): 90,
+    (255, 0, 0): 91,
+    (0, 255, 0): 92,
+    (255, 255, 0): 93,
+    (92, 92, 255): 94,
+    (255, 0, 255): 95,
+    (0, 255, 255): 96,
+    (255, 255, 255): 97,
 }
 
+
+def _distance(a: typing.Sequence[int], b: typing.Sequence[int]) -> int:
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+@functools.lru_cache(maxsize=None)
+def _palette_tables() -> (
+    typing.Tuple[typing.List[int], typing.List[int], typing.List[int]]
+):
+    """
+    Build the tables used to find the nearest 256 and 16 color codes.
+
+    Returns the nearest color cube level and the nearest grayscale ramp step for
+    each channel value, and the nearest basic color code for each cube color.
+    """
+    cube = [
+        min(range(6), key=lambda i: abs(_cube_levels[i] - value))
+        for value in range(256)
+    ]
+    gray = [min(23, max(0, (value - 3) // 10)) for value in range(256)]
+    basic = [
+        min(_basic_colors.items(), key=lambda item: _distance(item[0], rgb))[1]
+        for rgb in (
+            (_cube_levels[r], _cube_levels[g], _cube_levels[b])
+            for r in range(6)
+            for g in range(6)
+            for b in range(6)
+        )
+    ]
+    return cube, gray, basic
+
+
+def _nearest_256(red: int, green: int, blue: int) -> int:
+    """Return the 256 color palette index nearest to an RGB color."""
+    cube, gray, _ = _palette_tables()
+    r, g, b = cube[red], cube[green], cube[blue]
+    step = gray[(red + green + blue) // 3]
+    cube_rgb = (_cube_levels[r], _cube_levels[g], _cube_levels[b])
+    gray_rgb = (8 + 10 * step,) * 3
+    if _distance(gray_rgb, (red, green, blue)) < _distance(
+        cube_rgb, (red, green, blue)
+    ):
+        return 232 + step
+    return 16 + 36 * r + 6 * g + b
+
+
+def _nearest_16(red: int, green: int, blue: int) -> int:
+    """Return the foreground code of the basic color nearest to an RGB color."""
+    cube, _, basic = _palette_tables()
+    return basic[36 * cube[red] + 6 * cube[green] + cube[blue]]
+
+
+def rgb_escape_code(red: int, green: int, blue: int, background: bool = False) -> str:
+    """Return the escape code for an RGB color, downgraded to the color depth."""
+    if color_depth >= 24:
+        return esc(48 if background else 38, 2, red, green, blue)
+    if color_depth >= 8:
+        return esc(48 if background else 38, 5, _nearest_256(red, green, blue))
+    return esc(_nearest_16(red, green, blue) + (10 if background else 0))
+
+
+def _rgb_color(name: str) -> typing.Optional[str]:
+    """Return the escape code for an RGB color name (e.g. bg_#ff8800), or None."""
+    background = name.startswith("bg_")
+    if name.startswith(("fg_", "bg_")):
+        name = name[3:]
+
+    if name.startswith("#") and len(name) == 7:
+        channels = [name[1:3], name[3:5], name[5:7]]
+        if not all(c in "0123456789abcdefABCDEF" for c in name[1:]):
+            return None
+        red, green, blue = (int(channel, 16) for channel in channels)
+    elif name.startswith("rgb(") and name.endswith(")"):
+        channels = [channel.strip() for channel in name[4:-1].split(",")]
+        if len(channels) != 3 or not all(c.isdecimal() for c in channels):
+            return None
+        red, green, blue = (int(channel) for channel in channels)
+        if max(red, green, blue) > 255:
+            return None
+    else:
+        return None
+
+    return rgb_escape_code(red, green, blue, background)
+
+
+def _generated_escape_code(name: str) -> typing.Optional[str]:
+    """Return the escape code for a 256 or RGB color name, or None."""
+    return _256_color(name) or _rgb_color(name)
+
+
+class _EscapeCodes(typing.Dict[str, str]):
+    """
+    A dict of escape codes that generates 256 color and RGB codes when first used.
+
+    Looking up a single code (e.g. ``fg_123`` or ``fg_#ff8800``) only generates that
+    code. Iterating over the dict or checking its size generates all of the 256
+    color codes.
+    """
+
+    _generated = False
+
+    def _generate(self) -> None:
+        if not self._generated:
+            self._generated = True
+            for code in range(256):
+                self.setdefault("fg_%d" % code, esc(38, 5, code))
+                self.setdefault("bg_%d" % code, esc(48, 5, code))
+
+    def __missing__(self, key: str) -> str:
+        value = _generated_escape_code(key)
+        if value is None:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return super().__contains__(key) or (
+            isinstance(key, str) and _generated_escape_code(key) is not None
+        )
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __iter__(self):
+        self._generate()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._generate()
+        return super().__len__()
+
+    def __repr__(self) -> str:
+        self._generate()
+        return super().__repr__()
+
+    def keys(self):
+        self._generate()
+        return super().keys()
+
+    def values(self):
+        self._generate()
+        return super().values()
+
+    def items(self):
+        self._generate()
+        return super().items()
+
+    def copy(self) -> typing.Dict[str, str]:
+        self._generate()
+        return dict(self)
+
+
+escape_codes = _EscapeCodes(
+    {
+        "reset": esc(0),
+        "bold": esc(1),
+        "thin": esc(2),
+    }
+)
+
 escape_codes_foreground = {
     "black": 30,
     "red": 31,
@@ -94,12 +308,150 @@ for name, code in escape_codes_foreground.items():
 for name, code in escape_codes_background.items():
     escape_codes["bg_%s" % name] = esc(code)
 
-# 256 colour support
-for code in range(256):
-    escape_codes["fg_%d" % code] = esc(38, 5, code)
-    escape_codes["bg_%d" % code] = esc(48, 5, code)
+# 256 colour support is provided by _EscapeCodes, which generates them on demand
 
 
+@functools.lru_cache(maxsize=1024)
 def parse_colors(string: str) -> str:
-    """Return escape codes from a color sequence string."""
-    return "".join(escape_codes[n] for n in string.split(",") if n)
+    """
+    Return escape codes from a color sequence string.
+
+    Results are cached, use ``parse_colors.cache_info()`` to see hit/miss counts.
+    """
+    # Don't split on the commas in RGB colors, e.g. "bold,rgb(255,128,0)".
+    names = re.split(r",(?![^(]*\))", string) if "(" in string else string.split(",")
+    return "".join(escape_codes[n] for n in names if n)
+
+
+# Formatters that cache escape codes, which are told when the escape codes change.
+_formatters: "weakref.WeakSet[typing.Any]" = weakref.WeakSet()
+
+
+def _escape_codes_changed() -> None:
+    parse_colors.cache_clear()
+    for formatter in list(_formatters):
+        formatter._escape_codes_changed()
+
+
+def register_style(name: str, string: str) -> None:
+    """
+    Add a named escape code made from a color sequence string.
+
+    For example, ``register_style("alert", "bold_white,bg_red")`` allows ``alert``
+    to be used in format strings and ``log_colors``, including by formatters that
+    were created before the style was registered.
+    """
+    escape_codes[name] = parse_colors(string)
+    _escape_codes_changed()
+
+
+def set_color_depth(depth: int) -> None:
+    """
+    Set the number of bits of color (4, 8 or 24) used for RGB colors.
+
+    RGB colors are downgraded to the nearest 16 or 256 color code when the depth
+    is less than 24. The default is detected from the ``COLORTERM`` and ``TERM``
+    environment variables.
+    """
+    global color_depth
+    color_depth = depth
+    for name in [name for name in dict.keys(escape_codes) if _rgb_color(name)]:
+        del escape_codes[name]
+    _escape_codes_changed()
+
+
+@functools.lru_cache(maxsize=None)
+def _escape_code_patterns(binary: bool) -> typing.Tuple[typing.Pattern, typing.Pattern]:
+    """
+    Compile patterns matching the escape codes produced by esc(), and the start of
+    one at the end of a string (used when stripping escape codes in chunks).
+
+    These are compiled on first use to avoid slowing down importing colorlog.
+    """
+    escape_code = "\033\\[[0-9;]*m"
+    partial_escape_code = "\033(\\[[0-9;]*)?\\Z"
+    if binary:
+        return re.compile(escape_code.encode()), re.compile(
+            partial_escape_code.encode()
+        )
+    return re.compile(escape_code), re.compile(partial_escape_code)
+
+
+def strip_ansi(string: str) -> str:
+    """Remove the escape codes produced by ``esc()`` from a string."""
+    if "\033" not in string:
+        return string
+    return _escape_code_patterns(False)[0].sub("", string)
+
+
+if sys.version_info >= (3, 7):
+    _is_ascii = str.isascii
+else:
+
+    def _is_ascii(string: str) -> bool:
+        return all(ord(c) < 128 for c in string)
+
+
+@functools.lru_cache(maxsize=4096)
+def _character_width(character: str) -> int:
+    """Return the number of columns a (non-ASCII) character takes up on screen."""
+    import unicodedata
+
+    if unicodedata.category(character) in ("Mn", "Me", "Cf"):
+        return 0
+    if unicodedata.east_asian_width(character) in ("W", "F"):
+        return 2
+    return 1
+
+
+def display_width(string: str) -> int:
+    """
+    Return the number of columns a string takes up on screen.
+
+    Escape codes take up no space, wide (East Asian) characters take up two
+    columns, and combining and other zero-width characters take up none.
+    """
+    if "\033" in string:
+        string = strip_ansi(string)
+    if _is_ascii(string):
+        return len(string)
+    return sum(map(_character_width, string))
+
+
+def strip_ansi_lines(lines: typing.Iterable[str]) -> typing.Iterator[str]:
+    """Remove escape codes from each string in an iterable."""
+    sub = _escape_code_patterns(False)[0].sub
+    for line in lines:
+        yield sub("", line) if "\033" in line else line
+
+
+def strip_ansi_file(
+    source: typing.IO, destination: typing.IO, chunk_size: int = 1 << 20
+) -> None:
+    """
+    Copy a file, removing escape codes from it.
+
+    The file is read in chunks, so it doesn't need to fit in memory. Files can be
+    opened in text or binary mode; binary mode avoids decoding and is faster.
+    """
+    pending = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        binary = isinstance(chunk, bytes)
+        escape = b"\033" if binary else "\033"
+        pattern, partial = _escape_code_patterns(binary)
+        if pending:
+            chunk = pending + chunk
+            pending = None
+
+        # Hold back an escape code that is split across two chunks.
+        start = chunk.rfind(escape)
+        if start != -1 and partial.match(chunk, start):
+            chunk, pending = chunk[:start], chunk[start:]
+
+        destination.write(pattern.sub(escape[:0], chunk))
+
+    if pending:
+        destination.write(pending)
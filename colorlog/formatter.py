@@ -1,16 +1,29 @@
 """The ColoredFormatter class."""
 
+import collections
+import contextlib
+import fnmatch
+import functools
 import logging
 import os
+import re
+import string
 import sys
+import threading
+import time
+import traceback
 import typing
+import weakref
 
 import colorlog.escape_codes
+import colorlog.profiling
 
 __all__ = (
     "default_log_colors",
     "ColoredFormatter",
+    "FormatterView",
     "LevelFormatter",
+    "StripANSIFormatter",
     "TTYColoredFormatter",
 )
 
@@ -18,6 +31,14 @@ __all__ = (
 EscapeCodes = typing.Mapping[str, str]
 LogColors = typing.Mapping[str, str]
 SecondaryLogColors = typing.Mapping[str, LogColors]
+NameLogColors = typing.Mapping[str, typing.Union[str, LogColors]]
+TracebackColors = typing.Mapping[str, str]
+ExcInfo = typing.Tuple[
+    typing.Optional[typing.Type[BaseException]],
+    typing.Optional[BaseException],
+    typing.Any,
+]
+Renderer = typing.Callable[[typing.Mapping[str, typing.Any]], str]
 if sys.version_info >= (3, 8):
     _FormatStyle = typing.Literal["%", "{", "$"]
 else:
@@ -40,17 +61,270 @@ default_formats = {
 }
 
 
+# Unicode noncharacters, which are reserved for internal use and shouldn't appear in
+# text. Used to mark where escape codes go in a record rendered by render().
+_slot_characters = tuple(chr(c) for c in range(0xFDD0, 0xFDF0))
+
+
+# Matches the mapping keys used by a '%' style format string.
+_percent_fields = re.compile(r"%%|%\((?P<name>[^)]*)\)")
+_percent_placeholders = re.compile(r"%%|%\((?P<name>[^)]*)\)s")
+
+
+def _parse_fields(fmt: str, style: str) -> typing.Optional[typing.Tuple[str, ...]]:
+    """
+    Return the names a format string looks up, in the order they are used.
+
+    Returns None if the format string can't be parsed.
+    """
+    if style == "%":
+        names = [m.group("name") for m in _percent_fields.finditer(fmt)]
+        names = [name for name in names if name is not None]
+    elif style == "{":
+        names = []
+        pending = [fmt]
+        try:
+            while pending:
+                for _, field, spec, _ in string.Formatter().parse(pending.pop()):
+                    if field is not None:
+                        names.append(re.split(r"[.\[]", field, maxsplit=1)[0])
+                    if spec:
+                        pending.append(spec)
+        except ValueError:
+            return None
+        if any(name == "" or name.isdigit() for name in names):
+            return None
+    elif style == "$":
+        names = []
+        for m in string.Template.pattern.finditer(fmt):
+            if m.group("invalid") is not None:
+                return None
+            name = m.group("named") or m.group("braced")
+            if name is not None:
+                names.append(name)
+    else:
+        return None
+    return tuple(dict.fromkeys(names))
+
+
+def _strip_fields(
+    fmt: str, style: str, names: typing.Collection[str]
+) -> typing.Optional[str]:
+    """
+    Remove plain references to the given names from a format string.
+
+    Returns None if a name is still used after removing them, e.g. because it has a
+    format spec (``%(log_color)-8s``) that can't be removed without changing output.
+    """
+    if style == "%":
+        stripped = _percent_placeholders.sub(
+            lambda m: "" if m.group("name") in names else m.group(0), fmt
+        )
+    elif style == "{":
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(fmt):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None or (field in names and not spec and not conversion):
+                continue
+            parts.append("{" + field)
+            parts.append("!" + conversion if conversion else "")
+            parts.append(":" + spec if spec else "")
+            parts.append("}")
+        stripped = "".join(parts)
+    elif style == "$":
+        stripped = string.Template.pattern.sub(
+            lambda m: (
+                "" if (m.group("named") or m.group("braced")) in names else m.group(0)
+            ),
+            fmt,
+        )
+    else:
+        return None
+
+    if set(_parse_fields(stripped, style) or ()) & set(names):
+        return None
+    return stripped
+
+
+def _compile_renderer(fmt: str, style: str) -> Renderer:
+    """Return a function that interpolates a mapping into a format string."""
+    if style == "{":
+        return fmt.format_map
+    if style == "$":
+        return string.Template(fmt).substitute
+    return fmt.__mod__
+
+
+@functools.lru_cache(maxsize=None)
+def _traceback_frame_pattern() -> typing.Pattern[str]:
+    """Match the frame lines of a traceback (compiled on first use)."""
+    return re.compile(
+        r'^(?P<indent>[ |]*)File "(?P<filename>.*)", line (?P<lineno>\d+), '
+        r"in (?P<funcName>.*)$",
+        re.MULTILINE,
+    )
+
+
+if sys.version_info >= (3, 11):
+    _exception_groups: typing.Tuple[type, ...] = (BaseExceptionGroup,)  # noqa: F821
+else:
+    _exception_groups = ()
+
+
+def _exception_chain(exc: BaseException) -> typing.List[BaseException]:
+    """Return an exception and the exceptions it was chained to."""
+    chain = []
+    seen = set()
+    current: typing.Optional[BaseException] = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        chain.append(current)
+        if current.__cause__ is not None:
+            current = current.__cause__
+        elif not current.__suppress_context__:
+            current = current.__context__
+        else:
+            current = None
+    return chain
+
+
+def _exception_key(ei: ExcInfo) -> typing.Optional[typing.Hashable]:
+    """
+    Return a key identifying the text of a traceback, built from the type, message
+    and frames of each exception in the chain.
+
+    Returns None if the traceback can't be identified (and shouldn't be cached).
+    """
+    if ei[1] is None:
+        return None
+    key: typing.List[typing.Hashable] = []
+    for exc in _exception_chain(ei[1]):
+        if isinstance(exc, _exception_groups):
+            return None
+        try:
+            message = str(exc)
+        except Exception:
+            return None
+        frames = tuple(
+            (f.f_code.co_filename, lineno, f.f_code.co_name)
+            for f, lineno in traceback.walk_tb(exc.__traceback__)
+        )
+        notes = tuple(getattr(exc, "__notes__", None) or ())
+        key.append((type(exc), message, frames, notes, exc.__cause__ is not None))
+    if ei[1].__traceback__ is not ei[2]:
+        return None
+    return tuple(key)
+
+
+class _ColorMapping(dict):
+    """A dict of colors that calls a function whenever it is changed."""
+
+    __slots__ = ("_changed",)
+
+    def __init__(
+        self,
+        colors: typing.Mapping[str, typing.Any],
+        changed: typing.Callable[[], None],
+    ) -> None:
+        super().__init__(colors)
+        self._changed = changed
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other: typing.Any) -> "_ColorMapping":  # type: ignore
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def pop(self, *args: typing.Any) -> typing.Any:
+        value = super().pop(*args)
+        self._changed()
+        return value
+
+    def popitem(self) -> typing.Tuple[str, typing.Any]:
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def setdefault(self, key: str, default: typing.Any = None) -> typing.Any:
+        value = super().setdefault(key, default)
+        self._changed()
+        return value
+
+    def update(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def __reduce_ex__(self, protocol: typing.Any) -> typing.Tuple:
+        # Copied and pickled as a plain dict, without the function.
+        return dict, (dict(self),)
+
+
+class _ColoredRecordDict(typing.Mapping[str, typing.Any]):
+    """A read-only view of a record's attributes, with escape codes taking priority."""
+
+    __slots__ = ("attributes", "escapes")
+
+    def __init__(
+        self, attributes: typing.Mapping[str, typing.Any], escapes: EscapeCodes
+    ) -> None:
+        self.attributes = attributes
+        self.escapes = escapes
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key in self.escapes:
+            return self.escapes[key]
+        return self.attributes[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        yield from self.escapes
+        yield from (key for key in self.attributes if key not in self.escapes)
+
+    def __len__(self) -> int:
+        return len(self.escapes) + sum(
+            1 for key in self.attributes if key not in self.escapes
+        )
+
+    def __or__(self, other: typing.Mapping[str, typing.Any]) -> typing.Dict:
+        return {**self, **other}
+
+    def __ror__(self, other: typing.Mapping[str, typing.Any]) -> typing.Dict:
+        # Used by the stdlib styles to apply defaults (``defaults | record.__dict__``).
+        return {**other, **self}
+
+
 class ColoredRecord:
     """
-    Wraps a LogRecord, adding escape codes to the internal dict.
+    Wraps a LogRecord, adding escape codes to the attributes it provides.
 
-    The internal dict is used when formatting the message (by the PercentStyle,
-    StrFormatStyle, and StringTemplateStyle classes).
+    The ``__dict__`` attribute is a view of the escape codes and the record's own
+    ``__dict__``, which is used when formatting the message (by the PercentStyle,
+    StrFormatStyle, and StringTemplateStyle classes). Neither is copied.
     """
 
+    __slots__ = ("_attributes",)
+
     def __init__(self, record: logging.LogRecord, escapes: EscapeCodes) -> None:
-        self.__dict__.update(record.__dict__)
-        self.__dict__.update(escapes)
+        self._attributes = _ColoredRecordDict(record.__dict__, escapes)
+
+    @property  # type: ignore[override]
+    def __dict__(self) -> typing.Mapping[str, typing.Any]:  # type: ignore[override]
+        return self._attributes
+
+    def __getattr__(self, name: str) -> typing.Any:
+        try:
+            return self._attributes[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
 
 class ColoredFormatter(logging.Formatter):
@@ -73,6 +347,11 @@ class ColoredFormatter(logging.Formatter):
         no_color: bool = False,
         force_color: bool = False,
         defaults: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+        color_state_ttl: typing.Optional[float] = None,
+        name_log_colors: typing.Optional[NameLogColors] = None,
+        traceback_colors: typing.Optional[TracebackColors] = None,
+        exception_cache_size: int = 0,
+        column_widths: typing.Optional[typing.Mapping[str, int]] = None,
     ) -> None:
         """
         Set the format and colors the ColoredFormatter will use.
@@ -85,6 +364,15 @@ class ColoredFormatter(logging.Formatter):
         ``{key}_log_color``, using the value to select from a different
         ``log_colors`` set.
 
+        The ``name_log_colors`` argument sets ``name_log_color`` from the logger
+        name. Each key is a logger name, matching that logger and its children, or
+        a glob pattern (e.g. ``"app.*.db"``). The first matching key is used, and
+        its value is either a color name or a ``log_colors`` mapping.
+
+        The color mappings are copied, and the copies are available as attributes
+        of the same names. Changing or replacing them updates the formatter, but
+        changing the mappings that were passed in does not.
+
         :Parameters:
         - fmt (str): The format string to use.
         - datefmt (str): A format string for the date.
@@ -105,6 +393,23 @@ class ColoredFormatter(logging.Formatter):
             Disable color output.
         - force_color (bool):
             Enable color output. Takes precedence over `no_color`.
+        - color_state_ttl (float):
+            Seconds after which to re-check if color output should be disabled.
+            By default this is only checked when the formatter is created, or when
+            ``refresh_color_state()`` is called. Optional.
+        - name_log_colors (dict):
+            Map logger names or glob patterns to ``name_log_color`` colors.
+        - traceback_colors (dict):
+            Colors for the ``filename``, ``lineno``, ``funcName`` and ``exc_type``
+            parts of tracebacks and stack traces. Tracebacks are not colored by
+            default, and ``record.exc_text`` is always left uncolored.
+        - exception_cache_size (int):
+            Reuse the formatted text of up to this many tracebacks, identified by
+            the type, message and frames of each exception. Disabled by default.
+        - column_widths (dict):
+            Pad record attributes to a minimum width, e.g. ``{"levelname": 8}``.
+            Widths are measured in columns on screen, ignoring escape codes and
+            counting wide characters twice. Only string values are padded.
         """
 
         # Select a default format if `fmt` is not provided.
@@ -117,49 +422,771 @@ class ColoredFormatter(logging.Formatter):
         else:
             super().__init__(fmt, datefmt, style)
 
+        # Parse the format string once, so that only the escape codes and record
+        # attributes it uses are looked up when formatting each record.
+        self._style_name = style
+        self._fields = _parse_fields(fmt, style)
+        self._render = _compile_renderer(fmt, style)
+        self._defaults = getattr(self._style, "_defaults", None) or {}
+
+        self._escape_code_cache: typing.Dict[typing.Tuple[str, bool], EscapeCodes] = {}
+        self._slot_tables: typing.Dict[str, typing.List[typing.Tuple[str, str]]] = {}
+        self._time_cache: typing.Optional[typing.Tuple[int, str, typing.Any, str]] = (
+            None
+        )
+        self._uses_relative_time = (
+            "relativeTime" in self._fields
+            if self._fields is not None
+            else "relativeTime" in fmt
+        )
+        self._column_widths = dict(column_widths or {})
+        self._padded: typing.Dict[typing.Tuple[str, int], str] = {}
         self.log_colors = log_colors if log_colors is not None else default_log_colors
+        self._name_log_colors = self._copy_name_log_colors(name_log_colors or {})
         self.secondary_log_colors = (
             secondary_log_colors if secondary_log_colors is not None else {}
         )
         self.reset = reset
-        self.stream = stream
-        self.no_color = no_color
-        self.force_color = force_color
+        self._stream = stream
+        self._no_color = no_color
+        self._force_color = force_color
+        self.color_state_ttl = color_state_ttl
+        self.exception_cache_size = exception_cache_size
+        self._exception_cache: "collections.OrderedDict[typing.Hashable, str]" = (
+            collections.OrderedDict()
+        )
+        self._exception_cache_lock = threading.Lock()
+        self.traceback_colors = traceback_colors
+        self.refresh_color_state()
+        colorlog.escape_codes._formatters.add(self)
+
+    @property
+    def log_colors(self) -> LogColors:
+        """A mapping of log level names to color names."""
+        return self._log_colors
+
+    @log_colors.setter
+    def log_colors(self, value: LogColors) -> None:
+        self._log_colors = _ColorMapping(value, self._log_colors_changed)
+        self._log_colors_changed()
+
+    def _log_colors_changed(self) -> None:
+        self._escape_code_cache.clear()
+        self._slot_tables.clear()
+
+    @property
+    def secondary_log_colors(self) -> SecondaryLogColors:
+        """A mapping of secondary ``log_color`` names to ``log_colors`` mappings."""
+        return self._secondary_log_colors
+
+    @secondary_log_colors.setter
+    def secondary_log_colors(self, value: SecondaryLogColors) -> None:
+        changed = self._update_fields
+        self._secondary_log_colors = _ColorMapping(
+            {name: _ColorMapping(colors, changed) for name, colors in value.items()},
+            changed,
+        )
+        changed()
+
+    @property
+    def name_log_colors(self) -> NameLogColors:
+        """A mapping of logger names or glob patterns to ``name_log_color`` colors."""
+        return self._name_log_colors
+
+    @name_log_colors.setter
+    def name_log_colors(self, value: NameLogColors) -> None:
+        self._name_log_colors = self._copy_name_log_colors(value)
+        self._update_fields()
+
+    def _copy_name_log_colors(self, value: NameLogColors) -> "_ColorMapping":
+        """Copy a ``name_log_colors`` mapping, including any ``log_colors`` values."""
+        changed = self._update_fields
+        return _ColorMapping(
+            {
+                pattern: (
+                    colors
+                    if isinstance(colors, str)
+                    else _ColorMapping(colors, changed)
+                )
+                for pattern, colors in value.items()
+            },
+            changed,
+        )
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        # Locks and memoized functions can't be copied or pickled. They are created
+        # again, along with empty caches, by __setstate__(). A copy made while
+        # profiling is not profiled.
+        state = self.__dict__.copy()
+        for name in ("_exception_cache_lock", "_name_log_color", "_profiler", "format"):
+            state.pop(name, None)
+        state["_exception_cache"] = collections.OrderedDict()
+        state["_last_render"] = None
+        return state
+
+    def __setstate__(self, state: typing.Dict[str, typing.Any]) -> None:
+        self.__dict__.update(state)
+        self._exception_cache_lock = threading.Lock()
+        # The color mappings are restored as plain dicts.
+        self.log_colors = self._log_colors
+        self.name_log_colors = self._name_log_colors
+        self.secondary_log_colors = self._secondary_log_colors
+        colorlog.escape_codes._formatters.add(self)
+
+    def _escape_codes_changed(self) -> None:
+        """Called when a style is registered or the color depth is changed."""
+        self._update_fields()
+
+    def _update_fields(self) -> None:
+        """Update everything derived from the format string and color names."""
+        self._escape_code_cache.clear()
+        self._slot_tables.clear()
+        self._last_render: typing.Optional[typing.Tuple[typing.Any, ...]] = None
+
+        # Split the fields used by the format string into escape codes and record
+        # attributes. Escape codes take precedence over attributes with the same name.
+        if self._fields is None:
+            self._escape_names: typing.Optional[typing.Tuple[str, ...]] = None
+            self._record_names: typing.Tuple[str, ...] = ()
+        else:
+            escape_names = {"log_color"}
+            escape_names.update(
+                "%s_log_color" % name for name in self._secondary_log_colors
+            )
+            if self._name_log_colors:
+                escape_names.add("name_log_color")
+            self._escape_names = tuple(
+                name
+                for name in self._fields
+                if name in escape_names or name in colorlog.escape_codes.escape_codes
+            )
+            self._record_names = tuple(
+                name for name in self._fields if name not in self._escape_names
+            )
+
+        # Remove the escape codes from the format string. This fails if any escape
+        # code has a format spec or conversion, as its output depends on the code.
+        plain_fmt = None
+        if self._escape_names is not None:
+            plain_fmt = _strip_fields(
+                self._style._fmt, self._style_name, self._escape_names
+            )
+
+        # Build a style without any escape codes, used to format records directly
+        # when color output is disabled. Records with padded columns are always
+        # rendered by _render_message().
+        self._plain_style: typing.Optional[logging.PercentStyle] = None
+        if plain_fmt is not None and not self._column_widths:
+            if sys.version_info >= (3, 10):
+                self._plain_style = type(self._style)(
+                    plain_fmt, defaults=self._defaults or None
+                )
+            else:
+                self._plain_style = type(self._style)(plain_fmt)
+
+        # Assign a slot character to each escape code, used by render(). Records are
+        # only rendered once if the escape codes are only used as they are, and there
+        # are enough slot characters for the format.
+        self._slots: typing.Optional[typing.Dict[str, str]] = None
+        if plain_fmt is not None and self._escape_names is not None:
+            names = ("reset", *self._escape_names)
+            if len(names) <= len(_slot_characters):
+                self._slots = dict(zip(names, _slot_characters))
+
+        # Matching logger names against the rules is memoized, so each level and
+        # logger name pair is only matched once.
+        self._name_log_color_rules = tuple(
+            (any(c in pattern for c in "*?["), pattern, colors)
+            for pattern, colors in self._name_log_colors.items()
+        )
+        self._name_log_color = functools.lru_cache(maxsize=4096)(
+            self._match_name_log_color
+        )
+        self._uses_name_log_color = bool(self._name_log_colors) and (
+            self._escape_names is None or "name_log_color" in self._escape_names
+        )
+
+    @property
+    def column_widths(self) -> typing.Mapping[str, int]:
+        """The minimum widths of record attributes, in columns on screen."""
+        return self._column_widths
+
+    @column_widths.setter
+    def column_widths(self, value: typing.Mapping[str, int]) -> None:
+        self._column_widths = dict(value)
+        self._padded.clear()
+        self._update_fields()
+
+    @property
+    def traceback_colors(self) -> typing.Optional[TracebackColors]:
+        """Colors for the parts of tracebacks, or None to leave them uncolored."""
+        return self._traceback_colors
+
+    @traceback_colors.setter
+    def traceback_colors(self, value: typing.Optional[TracebackColors]) -> None:
+        self._traceback_colors = value
+        self._traceback_escapes = None
+        if value:
+            parse_colors = colorlog.escape_codes.parse_colors
+            self._traceback_escapes = {k: parse_colors(v) for k, v in value.items()}
+        self._last_render = None
+        # Cached tracebacks were colored with the previous colors.
+        with self._exception_cache_lock:
+            self._exception_cache.clear()
+
+    @property
+    def stream(self) -> typing.Optional[typing.IO]:
+        """The stream formatted messages will be printed to."""
+        return self._stream
+
+    @stream.setter
+    def stream(self, value: typing.Optional[typing.IO]) -> None:
+        self._stream = value
+        self.refresh_color_state()
+
+    @property
+    def no_color(self) -> bool:
+        """Disable color output."""
+        return self._no_color
+
+    @no_color.setter
+    def no_color(self, value: bool) -> None:
+        self._no_color = value
+        self.refresh_color_state()
+
+    @property
+    def force_color(self) -> bool:
+        """Enable color output. Takes precedence over ``no_color``."""
+        return self._force_color
+
+    @force_color.setter
+    def force_color(self, value: bool) -> None:
+        self._force_color = value
+        self.refresh_color_state()
+
+    def refresh_color_state(self) -> None:
+        """
+        Decide if escape codes should be blanked, and cache the result.
+
+        Call this after redirecting the stream or changing the ``FORCE_COLOR`` or
+        ``NO_COLOR`` environment variables.
+        """
+        if self.force_color or "FORCE_COLOR" in os.environ:
+            blank = False
+        elif self.no_color or "NO_COLOR" in os.environ:
+            blank = True
+        elif self.stream is not None and not self.stream.isatty():
+            blank = True
+        else:
+            blank = False
+
+        self._blank = blank
+        self._color_state_checked = time.monotonic()
+
+    @contextlib.contextmanager
+    def profile(
+        self, profiler: typing.Optional[colorlog.profiling.FormatterProfile] = None
+    ) -> typing.Iterator[colorlog.profiling.FormatterProfile]:
+        """
+        Count the records formatted and time each stage of formatting them.
+
+        Stages are building the escape code map, formatting the message (including
+        the time and the message arguments), formatting exceptions and stack traces,
+        and appending the reset code. A profiler can be shared by several
+        formatters, and its counters can be read at any time:
+
+            with formatter.profile() as profiler:
+                ...
+            print(profiler.totals())
+
+        Formatting is not slowed down at all while no profile is active.
+        """
+        profiler = (
+            profiler if profiler is not None else colorlog.profiling.FormatterProfile()
+        )
+        previous = self.__dict__.get("_profiler")
+        self._profiler = profiler
+        self.format = self._format_profiled  # type: ignore
+        try:
+            yield profiler
+        finally:
+            if previous is None:
+                del self.format
+                del self._profiler
+            else:
+                self._profiler = previous
+
+    def _format_profiled(self, record: logging.LogRecord) -> str:
+        """Format a record like logging.Formatter.format(), timing each stage."""
+        stats = self._profiler.stats()
+        clock = time.perf_counter
+        start = clock()
+
+        if self._overrides_formatting():
+            # Subclasses that change how records are formatted are only timed as a
+            # whole, so that profiling doesn't change their output.
+            s = type(self).format(self, record)
+        else:
+            self._prepare(record)
+            if self._plain_style is not None and self._blank_escape_codes():
+                styled = escaped = clock()
+                s = self._plain_style.format(record)
+                reset = clock()
+            else:
+                styled = clock()
+                escapes = self._record_escape_codes(record)
+                escaped = clock()
+                s = self._render_message(record, escapes)
+                reset = clock()
+                s = self._append_reset(s, escapes)
+                stats.escape_codes += escaped - styled
+                stats.reset += clock() - reset
+            stats.style += (styled - start) + (reset - escaped)
+
+            exception = clock()
+            s = self._append_exception(record, s)
+            stats.exception += clock() - exception
+
+        stats.total += clock() - start
+        stats.records += 1
+        stats.characters += len(s)
+        return s
+
+    def format(self, record: logging.LogRecord) -> str:
+        if self._traceback_escapes is None and not self._uses_relative_time:
+            return super().format(record)
+        self._prepare(record)
+        return self._append_exception(record, self.formatMessage(record))
+
+    def _prepare(self, record: logging.LogRecord) -> None:
+        """Set the record attributes that are computed when it is formatted."""
+        record.message = record.getMessage()
+        if self.usesTime():
+            record.asctime = self.formatTime(record, self.datefmt)
+        if self._uses_relative_time:
+            record.relativeTime = "%.3f" % (record.relativeCreated / 1000)
+
+    def formatTime(
+        self, record: logging.LogRecord, datefmt: typing.Optional[str] = None
+    ) -> str:
+        """
+        Return the creation time of a record as formatted text.
+
+        The same as ``logging.Formatter.formatTime()``, except that the time is only
+        formatted with ``time.strftime()`` once for each second. The milliseconds
+        are then added to the cached text when ``datefmt`` is not set.
+        """
+        time_format = datefmt or self.default_time_format
+        converter = self.converter
+        second = int(record.created)
+        cached = self._time_cache
+        if (
+            cached is not None
+            and cached[0] == second
+            and cached[1] == time_format
+            and cached[2] == converter
+        ):
+            s = cached[3]
+        else:
+            s = time.strftime(time_format, converter(record.created))
+            self._time_cache = (second, time_format, converter, s)
+        if not datefmt and self.default_msec_format:
+            s = self.default_msec_format % (s, record.msecs)
+        return s
+
+    @typing.overload
+    def format_batch(
+        self, records: typing.Iterable[logging.LogRecord], terminator: None = None
+    ) -> typing.List[str]:
+        pass
+
+    @typing.overload
+    def format_batch(
+        self, records: typing.Iterable[logging.LogRecord], terminator: str
+    ) -> str:
+        pass
+
+    def format_batch(
+        self,
+        records: typing.Iterable[logging.LogRecord],
+        terminator: typing.Optional[str] = None,
+    ) -> typing.Union[str, typing.List[str]]:
+        """
+        Format several records, returning a list of messages.
+
+        If ``terminator`` is given, each message is followed by it and a single
+        string is returned instead, ready to be written to a stream at once.
+
+        The output is the same as calling ``format()`` for each record, but the
+        color state is only checked once and escape codes are looked up once for
+        each level.
+        """
+        if self._overrides_formatting():
+            messages = [self.format(record) for record in records]
+        else:
+            messages = self._format_batch(records)
+        if terminator is None:
+            return messages
+        return terminator.join(messages) + terminator if messages else ""
+
+    def _overrides_formatting(self) -> bool:
+        """
+        Return True if a subclass overrides how records are formatted.
+
+        Records are then formatted by calling those methods, instead of the
+        shortcuts used by format_batch(), render() and profile().
+        """
+        cls = type(self)
+        return (
+            cls.format is not ColoredFormatter.format
+            or cls.formatMessage is not ColoredFormatter.formatMessage
+            or cls.formatException is not ColoredFormatter.formatException
+        )
+
+    def _format_batch(
+        self, records: typing.Iterable[logging.LogRecord]
+    ) -> typing.List[str]:
+        blank = self._blank_escape_codes()
+        plain_style = self._plain_style if blank else None
+        escape_maps: typing.Dict[str, EscapeCodes] = {}
+        messages = []
+        for record in records:
+            self._prepare(record)
+
+            if plain_style is not None:
+                s = plain_style.format(record)
+            else:
+                if self._uses_name_log_color:
+                    escapes = self._record_escape_codes(record)
+                else:
+                    try:
+                        escapes = escape_maps[record.levelname]
+                    except KeyError:
+                        escapes = self._escape_code_map(record.levelname)
+                        escape_maps[record.levelname] = escapes
+                s = self._render_message(record, escapes)
+                s = self._append_reset(s, escapes)
+
+            if record.exc_info or record.exc_text or record.stack_info:
+                s = self._append_exception(record, s, colored=not blank)
+            messages.append(s)
+        return messages
+
+    def _append_exception(
+        self,
+        record: logging.LogRecord,
+        s: str,
+        colored: typing.Optional[bool] = None,
+    ) -> str:
+        """
+        Append a record's traceback and stack trace to a message.
+
+        Colored tracebacks are only added to the output, leaving the uncolored text
+        in ``record.exc_text`` for other handlers.
+        """
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        exc_text = record.exc_text
+        if colored is None:
+            colored = not self._blank
+        colored = colored and self._traceback_escapes is not None
+        if colored and record.exc_info:
+            exc_text = self._format_traceback(record.exc_info, colored=True)
+        if exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + exc_text
+        if record.stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            stack = self.formatStack(record.stack_info)
+            s = s + (self._color_traceback(stack, ()) if colored else stack)
+        return s
+
+    def render(self, record: logging.LogRecord, output: str = "colored") -> str:
+        """
+        Format a record as ``"colored"``, ``"plain"`` or ``"stripped"`` output.
+
+        The record is formatted once, with a placeholder where each escape code goes,
+        and the result is kept until another record is rendered. Rendering the same
+        record again (e.g. for another handler) only replaces or removes the
+        placeholders, unless its ``msg`` or ``args`` were replaced in between (e.g.
+        by a handler's filter). Filters that change other attributes, or change
+        ``msg`` or ``args`` in place, should be added to the logger instead.
+        ``"colored"`` output is plain if color output is disabled, and
+        ``"stripped"`` output also removes any escape codes in the message itself.
+        """
+        if output not in ("colored", "plain", "stripped"):
+            raise ValueError("Unknown output %r" % output)
+
+        slots = self._slots
+        if slots is None or self._overrides_formatting():
+            # Fall back to formatting the record for each output.
+            s = self.format(record)
+            return s if output == "colored" else colorlog.escape_codes.strip_ansi(s)
+
+        colored_text, plain_text = self._render_segments(record, slots)
+        if output == "colored" and not self._blank_escape_codes():
+            s = colored_text
+            for c, code in self._slot_table(record, slots):
+                s = s.replace(c, code)
+            return s
+        s = plain_text
+        for c in slots.values():
+            s = s.replace(c, "")
+        if output == "stripped":
+            s = colorlog.escape_codes.strip_ansi(s)
+        return s
+
+    def view(self, output: str = "colored") -> "FormatterView":
+        """Return a formatter for a handler that uses render() with this output."""
+        return FormatterView(self, output)
+
+    def _render_segments(
+        self, record: logging.LogRecord, slots: typing.Dict[str, str]
+    ) -> typing.Tuple[str, str]:
+        """Format a record with slot characters in place of escape codes."""
+        msg, args = record.msg, record.args
+        cached = self._last_render
+        if (
+            cached is not None
+            and cached[0]() is record
+            and cached[1] is msg
+            and cached[2] is args
+        ):
+            return cached[3]
+
+        self._prepare(record)
+        message = self._render_message(record, slots)
+        reset = slots["reset"]
+        if self.reset and not message.endswith(reset):
+            message += reset
+        plain_text = self._append_exception(record, message, colored=False)
+        colored_text = plain_text
+        if self._traceback_escapes is not None:
+            colored_text = self._append_exception(record, message, colored=True)
+
+        segments = (colored_text, plain_text)
+        # Only a weak reference is kept, so the record (and its traceback) can be
+        # freed, and nothing is added to the record itself.
+        self._last_render = (weakref.ref(record), msg, args, segments)
+        return segments
+
+    def _slot_table(
+        self, record: logging.LogRecord, slots: typing.Dict[str, str]
+    ) -> typing.List[typing.Tuple[str, str]]:
+        """Return the slot characters and the escape codes that replace them."""
+        if not self._uses_name_log_color:
+            try:
+                return self._slot_tables[record.levelname]
+            except KeyError:
+                pass
+        escapes = self._record_escape_codes(record)
+        table = [(c, escapes[name]) for name, c in slots.items()]
+        if not self._uses_name_log_color:
+            self._slot_tables[record.levelname] = table
+        return table
+
+    def formatException(self, ei: ExcInfo) -> str:  # type: ignore[override]
+        return self._format_traceback(ei, colored=False)
+
+    def _format_traceback(self, ei: ExcInfo, colored: bool) -> str:
+        """Format a traceback, reusing the text of identical tracebacks."""
+        if self.exception_cache_size <= 0:
+            return self._render_traceback(ei, colored)
+
+        key = _exception_key(ei)
+        if key is None:
+            return self._render_traceback(ei, colored)
+
+        cache = self._exception_cache
+        with self._exception_cache_lock:
+            try:
+                cache.move_to_end((key, colored))
+                return cache[key, colored]
+            except KeyError:
+                pass
+        text = self._render_traceback(ei, colored)
+        with self._exception_cache_lock:
+            cache[key, colored] = text
+            while len(cache) > self.exception_cache_size:
+                cache.popitem(last=False)
+        return text
+
+    def _render_traceback(self, ei: ExcInfo, colored: bool) -> str:
+        text = super().formatException(ei)  # type: ignore[arg-type]
+        if colored and ei[1] is not None:
+            names = set()
+            for exc in _exception_chain(ei[1]):
+                cls = type(exc)
+                names.add(cls.__qualname__)
+                names.add("%s.%s" % (cls.__module__, cls.__qualname__))
+            text = self._color_traceback(text, names)
+        return text
+
+    def _color_traceback(self, text: str, exc_types: typing.Collection[str]) -> str:
+        """Add traceback_colors to the frame and exception type lines of a trace."""
+        escapes = self._traceback_escapes or {}
+        reset = colorlog.escape_codes.escape_codes["reset"]
+
+        def paint(key: str, value: str) -> str:
+            code = escapes.get(key)
+            return code + value + reset if code else value
+
+        def frame(match: typing.Match[str]) -> str:
+            return '%sFile "%s", line %s, in %s' % (
+                match.group("indent"),
+                paint("filename", match.group("filename")),
+                paint("lineno", match.group("lineno")),
+                paint("funcName", match.group("funcName")),
+            )
+
+        text = _traceback_frame_pattern().sub(frame, text)
+        if exc_types and "exc_type" in escapes:
+            lines = text.split("\n")
+            for i, line in enumerate(lines):
+                name, sep, rest = line.partition(":")
+                if name in exc_types:
+                    lines[i] = paint("exc_type", name) + sep + rest
+            text = "\n".join(lines)
+        return text
 
     def formatMessage(self, record: logging.LogRecord) -> str:
         """Format a message from a record object."""
-        escapes = self._escape_code_map(record.levelname)
-        wrapper = ColoredRecord(record, escapes)
-        message = super().formatMessage(wrapper)  # type: ignore
+        if self._plain_style is not None and self._blank_escape_codes():
+            return self._plain_style.format(record)
+
+        escapes = self._record_escape_codes(record)
+        message = self._render_message(record, escapes)
         message = self._append_reset(message, escapes)
         return message
 
+    def _render_message(self, record: logging.LogRecord, escapes: EscapeCodes) -> str:
+        """Interpolate the fields used by the format string into a message."""
+        attributes = record.__dict__
+        if self._escape_names is None:
+            if self._column_widths:
+                escapes = dict(escapes)
+                for name, width in self._column_widths.items():
+                    if name in attributes:
+                        escapes[name] = self._pad(attributes[name], width)
+            wrapper = ColoredRecord(record, escapes)
+            return super().formatMessage(wrapper)  # type: ignore
+
+        values = dict(escapes)
+        for name in self._record_names:
+            if name in attributes:
+                values[name] = attributes[name]
+            elif name in self._defaults:
+                values[name] = self._defaults[name]
+        if self._column_widths:
+            for name, width in self._column_widths.items():
+                if name in values:
+                    values[name] = self._pad(values[name], width)
+        try:
+            return self._render(values)
+        except KeyError as e:
+            raise ValueError("Formatting field not found in record: %s" % e)
+
+    def _pad(self, value: typing.Any, width: int) -> typing.Any:
+        """
+        Pad a string with spaces until it is ``width`` columns wide on screen.
+
+        Padded strings are cached (up to a limit), so fixed values like level names
+        are only measured once.
+        """
+        if not isinstance(value, str):
+            return value
+        key = (value, width)
+        try:
+            return self._padded[key]
+        except KeyError:
+            pass
+        padding = width - colorlog.escape_codes.display_width(value)
+        padded = value + " " * padding if padding > 0 else value
+        if len(self._padded) < 1024:
+            self._padded[key] = padded
+        return padded
+
+    def _record_escape_codes(self, record: logging.LogRecord) -> EscapeCodes:
+        """Return the escape codes for a record's level and logger name."""
+        escapes = self._escape_code_map(record.levelname)
+        if self._uses_name_log_color and not self._blank:
+            escapes = dict(escapes)
+            escapes["name_log_color"] = self._name_log_color(
+                record.levelno, record.name
+            )
+        return escapes
+
+    def _match_name_log_color(self, levelno: int, name: str) -> str:
+        """Return the escape codes for the first rule matching a logger name."""
+        for is_pattern, pattern, colors in self._name_log_color_rules:
+            if is_pattern:
+                matched = fnmatch.fnmatchcase(name, pattern)
+            else:
+                matched = name == pattern or name.startswith(pattern + ".")
+            if matched:
+                if not isinstance(colors, str):
+                    colors = colors.get(logging.getLevelName(levelno), "")
+                return colorlog.escape_codes.parse_colors(colors)
+        return ""
+
     def _escape_code_map(self, item: str) -> EscapeCodes:
+        """
+        Return a map of keys to escape codes for use in message formatting.
+
+        Maps are built once for each level name and cached until ``log_colors``,
+        ``secondary_log_colors`` or ``name_log_colors`` are changed. Changes to the
+        result of _blank_escape_codes() select a different cached map.
+        """
+        blank = self._blank_escape_codes()
+        try:
+            return self._escape_code_cache[item, blank]
+        except KeyError:
+            codes = self._build_escape_code_map(item, blank)
+            self._escape_code_cache[item, blank] = codes
+            return codes
+
+    def _build_escape_code_map(self, item: str, blank: bool) -> EscapeCodes:
         """
         Build a map of keys to escape codes for use in message formatting.
 
-        If _blank_escape_codes() returns True, all values will be an empty string.
+        Only the escape codes used by the format string and ``reset`` are included,
+        unless the format string couldn't be parsed. If blank is True, all values
+        will be an empty string.
         """
-        codes = {**colorlog.escape_codes.escape_codes}
-        codes.setdefault("log_color", self._get_escape_code(self.log_colors, item))
-        for name, colors in self.secondary_log_colors.items():
-            codes.setdefault("%s_log_color" % name, self._get_escape_code(colors, item))
-        if self._blank_escape_codes():
+        escape_codes = colorlog.escape_codes.escape_codes
+        log_colors = {"log_color": self._log_colors}
+        for name, colors in self._secondary_log_colors.items():
+            log_colors["%s_log_color" % name] = colors
+
+        names = self._escape_names
+        if names is None:
+            names = (*escape_codes, *log_colors)
+            if self._name_log_colors:
+                names = (*names, "name_log_color")
+
+        codes = {"reset": escape_codes["reset"]}
+        for name in names:
+            if name == "name_log_color" and self._name_log_colors:
+                # Set for each record from the logger name by formatMessage().
+                codes[name] = ""
+            elif name in escape_codes:
+                codes[name] = escape_codes[name]
+            else:
+                codes[name] = self._get_escape_code(log_colors[name], item)
+        if blank:
             codes = {key: "" for key in codes.keys()}
         return codes
 
-    def _blank_escape_codes(self):
+    def _blank_escape_codes(self) -> bool:
         """Return True if we should be prevented from printing escape codes."""
-        if self.force_color or "FORCE_COLOR" in os.environ:
-            return False
-
-        if self.no_color or "NO_COLOR" in os.environ:
-            return True
-
-        if self.stream is not None and not self.stream.isatty():
-            return True
-
-        return False
+        if (
+            self.color_state_ttl is not None
+            and time.monotonic() - self._color_state_checked >= self.color_state_ttl
+        ):
+            self.refresh_color_state()
+        return self._blank
 
     @staticmethod
     def _get_escape_code(log_colors: LogColors, item: str) -> str:
@@ -179,17 +1206,23 @@ class ColoredFormatter(logging.Formatter):
 class LevelFormatter:
     """An extension of ColoredFormatter that uses per-level format strings."""
 
-    def __init__(self, fmt: typing.Mapping[str, str], **kwargs: typing.Any) -> None:
+    def __init__(
+        self, fmt: typing.Mapping[typing.Union[str, int], str], **kwargs: typing.Any
+    ) -> None:
         """
         Configure a ColoredFormatter with its own format string for each log level.
 
         Supports fmt as a dict. All other args are passed on to the
         ``colorlog.ColoredFormatter`` constructor.
 
+        Records use the format string for the highest level at or below their own
+        level, so custom levels use the format of the level below them. Records below
+        all of the configured levels use the format for the lowest level.
+
         :Parameters:
         - fmt (dict):
-            A mapping of log levels (represented as strings, e.g. 'WARNING') to
-            format strings. (*New in version 2.7.0)
+            A mapping of log levels (represented as strings, e.g. 'WARNING', or as
+            numbers, e.g. 35) to format strings. (*New in version 2.7.0)
         (All other parameters are the same as in colorlog.ColoredFormatter)
 
         Example:
@@ -208,8 +1241,109 @@ class LevelFormatter:
             level: ColoredFormatter(fmt=f, **kwargs) for level, f in fmt.items()
         }
 
+        # Levels sorted by number, used to pick a formatter for each level number.
+        levels = [
+            (self._level_number(level), formatter)
+            for level, formatter in self.formatters.items()
+        ]
+        self._levels = sorted(
+            ((number, f) for number, f in levels if number is not None),
+            key=lambda item: item[0],
+        )
+        # The formatter selected for each level number and name, as records are
+        # matched by name first.
+        self._formatters_by_level: typing.Dict[
+            typing.Tuple[int, str], ColoredFormatter
+        ] = {}
+
+    @staticmethod
+    def _level_number(level: typing.Union[str, int]) -> typing.Optional[int]:
+        """Return the number for a level, or None if it's an unknown level name."""
+        if isinstance(level, int):
+            return level
+        number = logging.getLevelName(level)
+        return number if isinstance(number, int) else None
+
+    def _select_formatter(self, record: logging.LogRecord) -> ColoredFormatter:
+        """Find the formatter to use for a record's level."""
+        if record.levelname in self.formatters:
+            return self.formatters[record.levelname]
+        selected = None
+        for number, formatter in self._levels:
+            if number > record.levelno and selected is not None:
+                break
+            selected = formatter
+        return selected or next(iter(self.formatters.values()))
+
+    @contextlib.contextmanager
+    def profile(
+        self, profiler: typing.Optional[colorlog.profiling.FormatterProfile] = None
+    ) -> typing.Iterator[colorlog.profiling.FormatterProfile]:
+        """Profile all of the per-level formatters, see ColoredFormatter.profile()."""
+        profiler = (
+            profiler if profiler is not None else colorlog.profiling.FormatterProfile()
+        )
+        with contextlib.ExitStack() as stack:
+            for formatter in self.formatters.values():
+                stack.enter_context(formatter.profile(profiler))
+            yield profiler
+
+    def format(self, record: logging.LogRecord) -> str:
+        key = (record.levelno, record.levelname)
+        try:
+            formatter = self._formatters_by_level[key]
+        except KeyError:
+            formatter = self._select_formatter(record)
+            self._formatters_by_level[key] = formatter
+        return formatter.format(record)
+
+
+class FormatterView(logging.Formatter):
+    """
+    Share one ColoredFormatter between several handlers, each with its own output.
+
+    Each record is only formatted once, however many views it is passed to:
+
+        formatter = colorlog.ColoredFormatter(...)
+        console_handler.setFormatter(formatter.view("colored"))
+        file_handler.setFormatter(formatter.view("plain"))
+    """
+
+    def __init__(self, formatter: ColoredFormatter, output: str = "colored") -> None:
+        """
+        :Parameters:
+        - formatter (colorlog.ColoredFormatter):
+            The formatter used to render records.
+        - output ('colored' or 'plain' or 'stripped'):
+            See ``ColoredFormatter.render()``.
+        """
+        if output not in ("colored", "plain", "stripped"):
+            raise ValueError("Unknown output %r" % output)
+        super().__init__()
+        self.formatter = formatter
+        self.output = output
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.formatter.render(record, self.output)
+
+
+class StripANSIFormatter(logging.Formatter):
+    """
+    Wraps another formatter, removing escape codes from its output.
+
+    Useful when one formatter is shared by handlers for a terminal and a file:
+
+        file_handler.setFormatter(colorlog.StripANSIFormatter(colored_formatter))
+    """
+
+    def __init__(
+        self, formatter: typing.Union[logging.Formatter, LevelFormatter]
+    ) -> None:
+        super().__init__()
+        self.formatter = formatter
+
     def format(self, record: logging.LogRecord) -> str:
-        return self.formatters[record.levelname].format(record)
+        return colorlog.escape_codes.strip_ansi(self.formatter.format(record))
 
 
 # Provided for backwards compatibility. The features provided by this subclass are now
@@ -0,0 +1,439 @@
+"""Handlers that can be used alongside the ColoredFormatter class."""
+
+import collections
+import copy
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import typing
+
+import colorlog.formatter
+
+if typing.TYPE_CHECKING:
+    import asyncio
+
+__all__ = (
+    "AsyncColoredStreamHandler",
+    "BufferedStreamHandler",
+    "DeduplicatingHandler",
+    "QueueHandler",
+)
+
+# Used to render exception text before records are put on a queue.
+_exception_formatter = logging.Formatter()
+
+
+class AsyncColoredStreamHandler(logging.Handler):
+    """
+    A handler that writes formatted records from a task on an asyncio event loop.
+
+    Records are formatted when they are logged, and the resulting lines are queued
+    and written by a background task so that a slow terminal or pipe doesn't block
+    the event loop. Call ``await handler.start()`` from the event loop to start the
+    task and ``await handler.stop()`` to write any remaining lines.
+    """
+
+    terminator = "\n"
+
+    def __init__(
+        self,
+        writer: typing.Optional["asyncio.StreamWriter"] = None,
+        maxsize: int = 1000,
+        policy: str = "drop",
+        encoding: str = "utf-8",
+    ) -> None:
+        """
+        Set where lines are written to and what happens when the queue is full.
+
+        :Parameters:
+        - writer (asyncio.StreamWriter):
+            The writer to write lines to. By default a non-blocking writer for
+            ``sys.stdout`` is created by ``start()``, which requires stdout to be a
+            terminal, pipe or socket.
+        - maxsize (int):
+            The maximum number of lines to queue.
+        - policy ('drop' or 'block'):
+            When the queue is full, either drop new lines (counting them in
+            ``dropped``) or block. Blocking in the event loop's thread writes the
+            queued lines to the writer's buffer immediately instead of waiting.
+        - encoding (str):
+            The encoding used to write lines.
+        """
+        super().__init__()
+        if policy not in ("drop", "block"):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.writer = writer
+        self.maxsize = maxsize
+        self.policy = policy
+        self.encoding = encoding
+        self.dropped = 0
+        self.setFormatter(
+            colorlog.formatter.ColoredFormatter(
+                stream=sys.stdout if writer is None else None
+            )
+        )
+        self._lines: typing.Deque[str] = collections.deque()
+        self._space = threading.Event()
+        self._loop: typing.Optional["asyncio.AbstractEventLoop"] = None
+        self._thread: typing.Optional[int] = None
+        self._ready: typing.Optional["asyncio.Event"] = None
+        self._task: typing.Optional["asyncio.Future"] = None
+        self._stopping = False
+        self._broken = False
+        self._stdout_blocking: typing.Optional[bool] = None
+
+    async def start(self) -> None:
+        """Start writing lines from a task on the running event loop."""
+        # Imported here as importing asyncio is slow, and most programs don't use it.
+        import asyncio
+
+        if sys.version_info >= (3, 7):
+            loop = asyncio.get_running_loop()
+        else:
+            loop = asyncio.get_event_loop()
+        if self.writer is None:
+            # The transport sets stdout to non-blocking mode, which affects the whole
+            # process, so stop() puts it back. It writes to a duplicate of stdout's
+            # file descriptor, so that closing the transport leaves stdout open.
+            fd = sys.stdout.fileno()
+            self._stdout_blocking = os.get_blocking(fd)
+            pipe = os.fdopen(os.dup(fd), "wb", buffering=0)
+            transport, protocol = await loop.connect_write_pipe(
+                asyncio.streams.FlowControlMixin, pipe  # type: ignore
+            )
+            self.writer = asyncio.StreamWriter(transport, protocol, None, loop)
+        self._loop = loop
+        self._thread = threading.get_ident()
+        self._ready = asyncio.Event()
+        self._ready.set()
+        self._stopping = False
+        self._broken = False
+        self._task = asyncio.ensure_future(self._drain())
+
+    async def stop(self) -> None:
+        """
+        Write all queued lines and stop the task started by ``start()``.
+
+        If ``start()`` created a writer for ``sys.stdout``, it is closed and stdout
+        is returned to blocking mode.
+        """
+        if self._task is not None and self._ready is not None:
+            self._stopping = True
+            self._ready.set()
+            await self._task
+            self._task = None
+        self._loop = None
+        self._ready = None
+        if self._stdout_blocking is not None and self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            os.set_blocking(sys.stdout.fileno(), self._stdout_blocking)
+            self._stdout_blocking = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Check if the line would be dropped before formatting the record.
+            if self._broken:
+                # The writer failed, so lines can only be dropped.
+                self.dropped += 1
+                return
+            if len(self._lines) >= self.maxsize:
+                if self.policy == "drop":
+                    self.dropped += 1
+                    return
+                self._wait_for_space()
+
+            self._lines.append(self.format(record) + self.terminator)
+            loop, ready = self._loop, self._ready
+            if loop is not None and ready is not None:
+                if threading.get_ident() == self._thread:
+                    ready.set()
+                else:
+                    loop.call_soon_threadsafe(ready.set)
+        except Exception:
+            self.handleError(record)
+
+    def _wait_for_space(self) -> None:
+        """Block until there is space in the queue."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        if threading.get_ident() == self._thread:
+            self._write_lines()
+            return
+        while (
+            len(self._lines) >= self.maxsize
+            and self._task is not None
+            and not self._task.done()
+        ):
+            self._space.clear()
+            self._loop.call_soon_threadsafe(self._ready.set)  # type: ignore
+            self._space.wait(0.1)
+
+    def _write_lines(self) -> None:
+        """Move all queued lines into the writer's buffer."""
+        lines = self._lines
+        if lines and self.writer is not None:
+            chunk = []
+            while lines:
+                chunk.append(lines.popleft())
+            self.writer.write("".join(chunk).encode(self.encoding))
+        self._space.set()
+
+    async def _drain(self) -> None:
+        assert self._ready is not None and self.writer is not None
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            try:
+                self._write_lines()
+                await self.writer.drain()
+            except Exception:
+                self._writer_failed()
+                return
+            if self._stopping and not self._lines:
+                return
+
+    def _writer_failed(self) -> None:
+        """Report an error from the writer, and drop all current and future lines."""
+        self._broken = True
+        self.handleError(logging.makeLogRecord({"msg": "Failed to write log lines"}))
+        self.dropped += len(self._lines)
+        self._lines.clear()
+        self._space.set()
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """
+    A StreamHandler that writes formatted records to the stream in batches.
+
+    Each batch is joined and written with a single call to ``stream.write()``,
+    followed by a single ``stream.flush()``. Records are always written whole, so
+    the reset code at the end of each record is never separated from it.
+    """
+
+    def __init__(
+        self,
+        stream: typing.Optional[typing.TextIO] = None,
+        capacity: int = 100,
+        flush_level: int = logging.ERROR,
+        flush_interval: typing.Optional[float] = 1.0,
+    ) -> None:
+        """
+        Buffer formatted records until one of the flush conditions is met.
+
+        :Parameters:
+        - stream (typing.IO):
+            The stream to write to. Defaults to ``sys.stderr``.
+        - capacity (int):
+            Flush once this many records are buffered.
+        - flush_level (int):
+            Flush immediately when a record at or above this level is handled.
+        - flush_interval (float):
+            Flush this many seconds after the first record in a batch was buffered.
+            Disabled if None, in which case records may wait until the handler is
+            flushed or closed.
+        """
+        super().__init__(stream)
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self.flush_interval = flush_interval
+        self.buffer: typing.List[str] = []
+        self._batch_started: typing.Optional[float] = None
+        self._closed = False
+        self._flusher: typing.Optional[threading.Thread] = None
+        self._condition = threading.Condition(self.lock)  # type: ignore
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if len(self.buffer) >= self.capacity or record.levelno >= self.flush_level:
+            self.flush()
+        elif self._batch_started is None and self.flush_interval is not None:
+            with self._condition:
+                self._batch_started = time.monotonic()
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_periodically,
+                        name="colorlog.BufferedStreamHandler",
+                        daemon=True,
+                    )
+                    self._flusher.start()
+                self._condition.notify()
+
+    def _flush_periodically(self) -> None:
+        """Flush each batch ``flush_interval`` seconds after it started."""
+        with self._condition:
+            while not self._closed:
+                started = self._batch_started
+                if started is None or self.flush_interval is None:
+                    self._condition.wait()
+                    continue
+                remaining = started + self.flush_interval - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                else:
+                    self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered records to the stream."""
+        self.acquire()
+        try:
+            self._batch_started = None
+            if self.buffer:
+                text = "".join(self.buffer)
+                self.buffer.clear()
+                self.stream.write(text)
+            super().flush()
+        except Exception:
+            self.handleError(logging.makeLogRecord({"msg": "Failed to write records"}))
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        super().close()
+
+
+class _Repeats:
+    """The first time a message was seen in a window, and the repeats since."""
+
+    __slots__ = ("start", "count", "last")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.count = 0
+        self.last: typing.Optional[logging.LogRecord] = None
+
+
+class DeduplicatingHandler(logging.Handler):
+    """
+    Pass records to another handler, collapsing repeats of the same message.
+
+    Records are repeats if they have the same logger name, level and message
+    template (``record.msg``, before the arguments are merged in) as a record seen
+    less than ``window`` seconds earlier. Repeats are counted but not formatted,
+    and once the window has passed a single summary record is passed on instead,
+    e.g. ``"Connection refused (repeated 4312 times)"``. The summary uses the last
+    repeat's level, so the target's formatter colors it like the original.
+
+    Windows are checked when records are handled, in the order they started, so
+    each record only does a constant amount of work. Summaries for windows that
+    end when no more records are logged are passed on by ``flush()`` and
+    ``close()``.
+    """
+
+    def __init__(
+        self, target: logging.Handler, window: float = 1.0, level: int = logging.NOTSET
+    ) -> None:
+        """
+        Wrap a handler, passing on at most one record per message each window.
+
+        :Parameters:
+        - target (logging.Handler):
+            The handler to pass records and summaries to.
+        - window (float):
+            The number of seconds repeats of a message are collapsed for.
+        """
+        super().__init__(level)
+        self.target = target
+        self.window = window
+        self._repeats: "collections.OrderedDict[typing.Hashable, _Repeats]" = (
+            collections.OrderedDict()
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._expire(record.created)
+        try:
+            key = (record.name, record.levelno, record.msg)
+            repeats = self._repeats.get(key)
+        except TypeError:
+            # Messages that aren't hashable can't be collapsed.
+            self.target.handle(record)
+            return
+
+        if repeats is None:
+            self._repeats[key] = _Repeats(record.created)
+            self.target.handle(record)
+        else:
+            repeats.count += 1
+            repeats.last = record
+
+    def _expire(self, now: float) -> None:
+        """Pass on summaries for the windows that have ended."""
+        repeats = self._repeats
+        while repeats:
+            key = next(iter(repeats))
+            if now - repeats[key].start < self.window:
+                break
+            self._summarize(repeats.pop(key))
+
+    def _summarize(self, repeats: _Repeats) -> None:
+        if repeats.last is None:
+            return
+        summary = copy.copy(repeats.last)
+        summary.msg = "%s (repeated %d times)"
+        summary.args = (repeats.last.getMessage(), repeats.count)
+        summary.exc_info = None
+        summary.exc_text = None
+        summary.stack_info = None
+        summary.repeated = repeats.count
+        self.target.handle(summary)
+
+    def flush(self) -> None:
+        """Pass on summaries for all windows, and flush the target."""
+        self.acquire()
+        try:
+            while self._repeats:
+                self._summarize(self._repeats.popitem(last=False)[1])
+            self.target.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that leaves formatting to the handlers of a QueueListener.
+
+    The stdlib QueueHandler formats the whole record into its message before it is
+    put on the queue, which would prevent a ColoredFormatter on the other end from
+    adding colors. This handler only renders the message (``getMessage()``) and the
+    exception text, which can't always be sent to another thread or process.
+    """
+
+    def __init__(self, queue: typing.Any) -> None:
+        super().__init__(queue)
+        self.listener: typing.Optional[logging.handlers.QueueListener] = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self) -> None:
+        """Stop the listener (if it is still running) and close its handlers."""
+        listener = self.listener
+        if listener is not None and listener._thread is not None:  # type: ignore
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        super().close()
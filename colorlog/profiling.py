@@ -0,0 +1,77 @@
+"""Counters for the time ColoredFormatter spends in each stage of formatting."""
+
+import threading
+import typing
+
+__all__ = ("FormatterProfile", "FormatterStats")
+
+
+class FormatterStats:
+    """Records formatted, characters produced, and seconds spent in each stage."""
+
+    __slots__ = (
+        "records",
+        "characters",
+        "escape_codes",
+        "style",
+        "exception",
+        "reset",
+        "total",
+    )
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.characters = 0
+        self.escape_codes = 0.0
+        self.style = 0.0
+        self.exception = 0.0
+        self.reset = 0.0
+        self.total = 0.0
+
+    def __iadd__(self, other: "FormatterStats") -> "FormatterStats":
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def as_dict(self) -> typing.Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ", ".join("%s=%r" % item for item in self.as_dict().items())
+        return "%s(%s)" % (type(self).__name__, fields)
+
+
+class FormatterProfile:
+    """
+    Collect FormatterStats for each thread, and add them together on demand.
+
+    Each thread updates its own counters without taking a lock, so profiling a
+    formatter shared by several threads does not add contention between them.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads: typing.List[typing.Tuple[str, FormatterStats]] = []
+
+    def stats(self) -> FormatterStats:
+        """Return the counters for the current thread."""
+        try:
+            return self._local.stats
+        except AttributeError:
+            stats = self._local.stats = FormatterStats()
+            with self._lock:
+                self._threads.append((threading.current_thread().name, stats))
+            return stats
+
+    def per_thread(self) -> typing.List[typing.Tuple[str, FormatterStats]]:
+        """Return the name and counters of each thread that formatted a record."""
+        with self._lock:
+            return list(self._threads)
+
+    def totals(self) -> FormatterStats:
+        """Return the counters of all threads added together."""
+        totals = FormatterStats()
+        for _, stats in self.per_thread():
+            totals += stats
+        return totals
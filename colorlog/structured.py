@@ -0,0 +1,161 @@
+"""Formatters that output JSON and logfmt, sharing ColoredFormatter's colors."""
+
+import abc
+import json
+import json.encoder
+import logging
+import re
+import typing
+
+import colorlog.formatter
+
+__all__ = ("JSONFormatter", "LogfmtFormatter")
+
+# The fields used when none are given
+default_fields = ("asctime", "levelname", "name", "message")
+
+# Values that need to be quoted in logfmt output
+_logfmt_unsafe = re.compile(r'[\s"=\\]|^$')
+
+# Returns a quoted and escaped JSON string (uses the C implementation if available)
+_encode_string: typing.Callable[[str], str] = json.encoder.encode_basestring
+
+
+class _StructuredFormatter(colorlog.formatter.ColoredFormatter, metaclass=abc.ABCMeta):
+    """Format a fixed list of record attributes as key-value pairs."""
+
+    def __init__(
+        self,
+        fields: typing.Sequence[str] = default_fields,
+        field_colors: typing.Optional[typing.Mapping[str, str]] = None,
+        **kwargs: typing.Any
+    ) -> None:
+        """
+        Set the fields to output and the colors used for their values.
+
+        :Parameters:
+        - fields (list):
+            The record attributes to output, in order. Exception and stack
+            information is added as ``exc_info`` and ``stack_info`` when present.
+        - field_colors (dict):
+            A mapping of field names to the escape code used to color their value,
+            e.g. ``{"levelname": "log_color", "message": "message_log_color"}``.
+            Colors are only added when ColoredFormatter would add them. Raises
+            ValueError if a color isn't an escape code, ``log_color``, or a
+            configured ``<name>_log_color`` or ``name_log_color``.
+        (All other parameters are the same as in colorlog.ColoredFormatter, except
+        for ``fmt`` and ``style``)
+        """
+        self.fields = tuple(fields)
+        self.field_colors = dict(field_colors or {})
+
+        # A format string that uses every field and color, so that ColoredFormatter
+        # resolves the colors and knows if the time needs formatting.
+        names = (*self.field_colors.values(), *self.fields)
+        fmt = "".join("%%(%s)s" % name for name in names)
+        super().__init__(fmt=fmt, style="%", **kwargs)
+
+        # Colors that aren't escape codes would otherwise silently output the record
+        # attribute with the same name, or nothing.
+        for field, color in self.field_colors.items():
+            if color not in (self._escape_names or ()):
+                raise ValueError(
+                    "field_colors[%r] is not an escape code or configured log color: "
+                    "%r" % (field, color)
+                )
+
+        self._field_colors = tuple(self.field_colors.get(f) for f in self.fields)
+
+    def format(self, record: logging.LogRecord) -> str:
+        self._prepare(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        attributes = record.__dict__
+        values = [attributes.get(field) for field in self.fields]
+        escapes = self._record_escape_codes(record)
+        colors = [escapes[c] if c else "" for c in self._field_colors]
+        extra = []
+        if record.exc_text:
+            extra.append(("exc_info", record.exc_text))
+        if record.stack_info:
+            extra.append(("stack_info", self.formatStack(record.stack_info)))
+        return self._serialize(values, colors, escapes["reset"], extra)
+
+    @abc.abstractmethod
+    def _serialize(
+        self,
+        values: typing.List[typing.Any],
+        colors: typing.List[str],
+        reset: str,
+        extra: typing.List[typing.Tuple[str, str]],
+    ) -> str:
+        """Join the colored values and the extra items into a line of output."""
+
+
+class JSONFormatter(_StructuredFormatter):
+    """
+    Format records as JSON objects, optionally coloring values.
+
+    Keys are encoded once when the formatter is created, and string values are
+    encoded directly instead of building a dict to pass to ``json.dumps()``. Output
+    is only valid JSON when colors are disabled.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._keys = tuple(_encode_string(field) + ": " for field in self.fields)
+
+    @staticmethod
+    def _encode(value: typing.Any) -> str:
+        if isinstance(value, str):
+            return _encode_string(value)
+        if value is None or isinstance(value, (bool, int, float)):
+            return json.dumps(value)
+        return json.dumps(value, default=str)
+
+    def _serialize(self, values, colors, reset, extra):
+        encode = self._encode
+        parts = []
+        for key, value, color in zip(self._keys, values, colors):
+            if color:
+                parts.append(key + color + encode(value) + reset)
+            else:
+                parts.append(key + encode(value))
+        for key, value in extra:
+            parts.append(_encode_string(key) + ": " + _encode_string(value))
+        return "{" + ", ".join(parts) + "}"
+
+
+class LogfmtFormatter(_StructuredFormatter):
+    """
+    Format records as logfmt (``key=value`` pairs), optionally coloring values.
+
+    Values are only quoted when they contain whitespace, quotes, backslashes or
+    ``=``, or are empty.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._keys = tuple(field + "=" for field in self.fields)
+
+    @staticmethod
+    def _encode(value: typing.Any) -> str:
+        if value is None:
+            return ""
+        value = value if isinstance(value, str) else str(value)
+        if _logfmt_unsafe.search(value):
+            return _encode_string(value)
+        return value
+
+    def _serialize(self, values, colors, reset, extra):
+        encode = self._encode
+        parts = []
+        for key, value, color in zip(self._keys, values, colors):
+            if color:
+                parts.append(key + color + encode(value) + reset)
+            else:
+                parts.append(key + encode(value))
+        for key, value in extra:
+            parts.append(key + "=" + _encode_string(value))
+        return " ".join(parts)
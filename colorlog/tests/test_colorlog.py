@@ -1,6 +1,14 @@
 """Test the colorlog.colorlog module."""
 
+import copy
+import io
+import logging
+import pickle
 import sys
+import threading
+import time
+
+import pytest
 
 import colorlog
 
@@ -97,6 +105,52 @@ class TestLevelFormatter:
             },
         )
 
+    def test_level_formatter_dispatch(self):
+        formatter = colorlog.LevelFormatter(
+            fmt={
+                "INFO": "I:%(message)s",
+                "WARNING": "W:%(message)s",
+                45: "E:%(message)s",
+            },
+            log_colors={},
+            reset=False,
+        )
+        messages = {
+            level: formatter.format(
+                logging.makeLogRecord({"msg": "m", "levelno": level})
+            )
+            for level in (5, 20, 25, 30, 35, 40, 45, 50)
+        }
+        assert messages == {
+            5: "I:m",
+            20: "I:m",
+            25: "I:m",
+            30: "W:m",
+            35: "W:m",
+            40: "W:m",
+            45: "E:m",
+            50: "E:m",
+        }
+
+    def test_level_formatter_custom_level_name(self):
+        formatter = colorlog.LevelFormatter(
+            fmt={"INFO": "I:%(message)s", "CUSTOM": "C:%(message)s"}, reset=False
+        )
+        record = logging.makeLogRecord({"msg": "m", "levelno": 15})
+        record.levelname = "CUSTOM"
+        assert formatter.format(record) == "C:m"
+
+    def test_level_formatter_same_number(self):
+        formatter = colorlog.LevelFormatter(
+            fmt={"INFO": "I:%(message)s", "NOTICE": "N:%(message)s"}, reset=False
+        )
+        notice = logging.makeLogRecord({"msg": "m", "levelno": 20})
+        notice.levelname = "NOTICE"
+        info = logging.makeLogRecord({"msg": "m", "levelno": 20})
+        info.levelname = "INFO"
+        assert formatter.format(notice) == "N:m"
+        assert formatter.format(info) == "I:m"
+
 
 def test_ttycolorlog(create_and_test_logger, monkeypatch):
     monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
@@ -114,3 +168,497 @@ def test_ttycolorlog_notty(create_and_test_logger, monkeypatch):
         validator=lambda line: "\x1b[" not in line,
         stream=sys.stderr,
     )
+
+
+def test_escape_code_map_is_cached():
+    formatter = colorlog.ColoredFormatter()
+    assert formatter._escape_code_map("INFO") is formatter._escape_code_map("INFO")
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+
+
+def test_escape_code_map_cache_is_cleared():
+    formatter = colorlog.ColoredFormatter("%(log_color)s%(message_log_color)s")
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+    formatter.log_colors = {"INFO": "blue"}
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[34m"
+    formatter.secondary_log_colors = {"message": {"INFO": "red"}}
+    assert formatter._escape_code_map("INFO")["message_log_color"] == "\x1b[31m"
+
+
+def test_log_colors_are_copied():
+    log_colors = {"INFO": "green"}
+    secondary_log_colors = {"message": {"INFO": "green"}}
+    name_log_colors = {"app": {"INFO": "green"}}
+    formatter = colorlog.ColoredFormatter(
+        "%(log_color)s%(message_log_color)s%(name_log_color)s",
+        log_colors=log_colors,
+        secondary_log_colors=secondary_log_colors,
+        name_log_colors=name_log_colors,
+    )
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+
+    log_colors["INFO"] = "red"
+    secondary_log_colors["message"]["INFO"] = "red"
+    name_log_colors["app"]["INFO"] = "red"
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+    assert formatter._escape_code_map("INFO")["message_log_color"] == "\x1b[32m"
+    assert formatter.name_log_colors == {"app": {"INFO": "green"}}
+
+
+def test_log_colors_can_be_changed():
+    formatter = colorlog.ColoredFormatter(
+        "%(log_color)s%(message_log_color)s%(name_log_color)s",
+        secondary_log_colors={"message": {"INFO": "green"}},
+        name_log_colors={"app": {"INFO": "green"}},
+    )
+    record = logging.makeLogRecord({"name": "app", "levelname": "INFO", "levelno": 20})
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+    assert formatter._record_escape_codes(record)["name_log_color"] == "\x1b[32m"
+
+    formatter.log_colors["INFO"] = "blue"
+    formatter.secondary_log_colors["message"]["INFO"] = "red"
+    formatter.name_log_colors["app"]["INFO"] = "cyan"
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[34m"
+    assert formatter._escape_code_map("INFO")["message_log_color"] == "\x1b[31m"
+    assert formatter._record_escape_codes(record)["name_log_color"] == "\x1b[36m"
+
+    formatter.log_colors.update(INFO="red")
+    del formatter.secondary_log_colors["message"]
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[31m"
+    assert "message_log_color" not in formatter._escape_code_map("INFO")
+
+    copied = copy.deepcopy(formatter)
+    copied.log_colors["INFO"] = "green"
+    assert copied._escape_code_map("INFO")["log_color"] == "\x1b[32m"
+    assert formatter._escape_code_map("INFO")["log_color"] == "\x1b[31m"
+
+
+@pytest.mark.parametrize(
+    "fmt, style",
+    [
+        ("%(log_color)s%(levelname)-8s%(reset)s %(name)s %%(red)s", "%"),
+        ("{log_color}{levelname:<8}{reset} {name!r:>{name}} {{red}}", "{"),
+        ("${log_color}${levelname}${reset} $name $$red", "$"),
+    ],
+)
+def test_parse_fields(fmt, style):
+    fields = colorlog.formatter._parse_fields(fmt, style)
+    assert fields == ("log_color", "levelname", "reset", "name")
+
+
+def test_escape_code_map_uses_format_fields():
+    formatter = colorlog.ColoredFormatter("%(red)s%(message)s")
+    assert set(formatter._escape_code_map("INFO")) == {"red", "reset"}
+
+
+def test_extra_fields():
+    formatter = colorlog.ColoredFormatter("{log_color}{user}: {message}", style="{")
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    record.user = "sam"
+    assert formatter.format(record) == "\x1b[32msam: hello\x1b[0m"
+
+
+def test_missing_field():
+    formatter = colorlog.ColoredFormatter("%(user)s: %(message)s")
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    with pytest.raises(ValueError):
+        formatter.format(record)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="requires python3.10")
+def test_defaults():
+    formatter = colorlog.ColoredFormatter(
+        "%(user)s: %(message)s", defaults={"user": "nobody"}
+    )
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    assert formatter.format(record) == "nobody: hello\x1b[0m"
+
+
+def test_color_state_is_cached(monkeypatch):
+    formatter = colorlog.ColoredFormatter(stream=sys.stderr)
+    monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
+    assert formatter._blank_escape_codes()
+    formatter.refresh_color_state()
+    assert not formatter._blank_escape_codes()
+
+
+def test_color_state_ttl(monkeypatch):
+    monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
+    formatter = colorlog.ColoredFormatter(stream=sys.stderr, color_state_ttl=0)
+    monkeypatch.setattr(sys.stderr, "isatty", lambda: False)
+    assert formatter._blank_escape_codes()
+
+
+def test_color_state_setters():
+    formatter = colorlog.ColoredFormatter()
+    assert not formatter._blank_escape_codes()
+    formatter.no_color = True
+    assert formatter._blank_escape_codes()
+    formatter.force_color = True
+    assert not formatter._blank_escape_codes()
+
+
+@pytest.mark.parametrize(
+    "fmt, style, expected",
+    [
+        ("%(log_color)s%(levelname)s%(reset)s %%(red)s", "%", "%(levelname)s %%(red)s"),
+        ("{log_color}{levelname}{reset} {{red}}", "{", "{levelname} {{red}}"),
+        ("${log_color}$levelname$reset $$red", "$", "$levelname $$red"),
+        ("%(log_color)-8s%(levelname)s", "%", None),
+        ("{log_color:<8}{levelname}", "{", None),
+    ],
+)
+def test_strip_fields(fmt, style, expected):
+    names = ("log_color", "reset")
+    assert colorlog.formatter._strip_fields(fmt, style, names) == expected
+
+
+def test_no_color_uses_plain_style():
+    formatter = colorlog.ColoredFormatter(
+        "%(log_color)s%(levelname)s%(reset)s:%(message)s", no_color=True
+    )
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    assert formatter._plain_style is not None
+    assert formatter.format(record) == "INFO:hello"
+
+
+def test_colored_record_view():
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    record.message = record.getMessage()
+    wrapper = colorlog.formatter.ColoredRecord(record, {"red": "\x1b[31m"})
+    assert wrapper.message == "hello"
+    assert wrapper.red == "\x1b[31m"
+    assert wrapper.__dict__["levelname"] == "INFO"
+    assert len(wrapper.__dict__) == len(record.__dict__) + 1
+    for style, fmt in (("%", "%(red)s%(message)s"), ("{", "{red}{message}")):
+        formatter = logging.Formatter(fmt, style=style)
+        assert formatter.formatMessage(wrapper) == "\x1b[31mhello"
+
+
+def test_strip_ansi_formatter():
+    formatter = colorlog.StripANSIFormatter(
+        colorlog.ColoredFormatter("%(red)s%(message)s", force_color=True)
+    )
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    assert formatter.format(record) == "hello"
+
+
+def test_name_log_colors():
+    formatter = colorlog.ColoredFormatter(
+        "%(name_log_color)s%(name)s%(reset)s",
+        name_log_colors={
+            "app.db": "blue",
+            "app.*.cache": {"INFO": "cyan", "ERROR": "red"},
+            "app": "green",
+        },
+    )
+
+    def format(name, levelname="INFO"):
+        level = logging.getLevelName(levelname)
+        record = logging.makeLogRecord({"name": name, "levelno": level})
+        record.levelname = levelname
+        return formatter.format(record)
+
+    assert format("app.db") == "\x1b[34mapp.db\x1b[0m"
+    assert format("app.db.pool") == "\x1b[34mapp.db.pool\x1b[0m"
+    assert format("app.web.cache") == "\x1b[36mapp.web.cache\x1b[0m"
+    assert format("app.web.cache", "ERROR") == "\x1b[31mapp.web.cache\x1b[0m"
+    assert format("app.dbx") == "\x1b[32mapp.dbx\x1b[0m"
+    assert format("other") == "other\x1b[0m"
+    assert formatter._name_log_color.cache_info().currsize == 6
+
+    formatter.name_log_colors = {"other": "red"}
+    assert format("other") == "\x1b[31mother\x1b[0m"
+    formatter.no_color = True
+    assert format("other") == "other"
+
+
+def test_profile():
+    formatter = colorlog.ColoredFormatter("%(log_color)s%(message)s")
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    with formatter.profile() as profiler:
+        assert formatter.format(record) == "\x1b[32mhello\x1b[0m"
+        thread = threading.Thread(target=formatter.format, args=(record,))
+        thread.start()
+        thread.join()
+    assert "format" not in formatter.__dict__
+
+    totals = profiler.totals()
+    assert totals.records == 2
+    assert totals.characters == 2 * len("\x1b[32mhello\x1b[0m")
+    assert totals.total >= totals.escape_codes + totals.style + totals.reset > 0
+    assert len(profiler.per_thread()) == 2
+
+
+def test_level_formatter_profile():
+    formatter = colorlog.LevelFormatter({"INFO": "%(message)s", "ERROR": "%(message)s"})
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    with formatter.profile() as profiler:
+        formatter.format(record)
+    assert profiler.totals().records == 1
+
+
+def raise_error(message="failed"):
+    try:
+        raise ValueError(message)
+    except ValueError:
+        return sys.exc_info()
+
+
+def test_traceback_colors():
+    formatter = colorlog.ColoredFormatter(
+        "%(message)s",
+        traceback_colors={"lineno": "yellow", "exc_type": "red"},
+    )
+    record = logging.makeLogRecord({"msg": "hello", "exc_info": raise_error()})
+    output = formatter.format(record)
+    assert ", line \x1b[33m" in output
+    assert "\x1b[31mValueError\x1b[0m: failed" in output
+    assert "\x1b[" not in record.exc_text
+    assert colorlog.escape_codes.strip_ansi(output) == "hello\n" + record.exc_text
+
+    formatter.no_color = True
+    assert formatter.format(record) == "hello\n" + record.exc_text
+
+
+def test_exception_cache():
+    formatter = colorlog.ColoredFormatter(exception_cache_size=1)
+    ei = raise_error()
+    assert formatter.formatException(ei) is formatter.formatException(ei)
+    assert formatter.formatException(ei) is not formatter.formatException(
+        raise_error("another message")
+    )
+    assert len(formatter._exception_cache) == 1
+
+
+def test_exception_cache_is_cleared():
+    formatter = colorlog.ColoredFormatter(
+        traceback_colors={"exc_type": "red"}, exception_cache_size=4, force_color=True
+    )
+    record = logging.makeLogRecord({"msg": "m", "exc_info": raise_error("error")})
+    assert "\x1b[31mValueError" in formatter.format(record)
+
+    formatter.traceback_colors = {"exc_type": "blue"}
+    text = formatter.format(record)
+    assert "\x1b[34mValueError" in text
+    assert "\x1b[31m" not in text
+
+
+@pytest.mark.parametrize(
+    "duplicate", [copy.deepcopy, lambda f: pickle.loads(pickle.dumps(f))]
+)
+def test_formatter_can_be_copied(duplicate):
+    formatter = colorlog.ColoredFormatter(
+        "%(name_log_color)s%(name)s%(reset)s %(log_color)s%(message)s",
+        name_log_colors={"example": "blue"},
+        traceback_colors={"exc_type": "red"},
+        exception_cache_size=4,
+        force_color=True,
+    )
+    record = logging.makeLogRecord(
+        {"msg": "message", "name": "example", "exc_info": raise_error("error")}
+    )
+    expected = formatter.format(record)
+
+    with formatter.profile():
+        duplicated = duplicate(formatter)
+    assert "format" not in vars(duplicated)
+    assert not duplicated._exception_cache
+    record.exc_text = None
+    assert duplicated.format(record) == expected
+
+
+class CountingMessage:
+    """Count how many times a record's message was rendered."""
+
+    renders = 0
+
+    def __str__(self):
+        self.renders += 1
+        return "hello"
+
+
+def test_formatter_views():
+    formatter = colorlog.ColoredFormatter(
+        "%(log_color)s%(levelname)s%(reset)s:%(message)s",
+        traceback_colors={"exc_type": "red"},
+        force_color=True,
+    )
+    views = [formatter.view(output) for output in ("colored", "plain", "stripped")]
+    message = CountingMessage()
+    record = logging.makeLogRecord(
+        {"msg": message, "levelname": "INFO", "exc_info": raise_error("\x1b[1m")}
+    )
+
+    colored, plain, stripped = [view.format(record) for view in views]
+    assert message.renders == 1
+    assert colored.startswith("\x1b[32mINFO\x1b[0m:hello\x1b[0m\nTraceback")
+    assert colored.endswith("\x1b[31mValueError\x1b[0m: \x1b[1m")
+    assert plain == "INFO:hello\n" + record.exc_text
+    assert stripped == "INFO:hello\n" + colorlog.escape_codes.strip_ansi(
+        record.exc_text
+    )
+
+    formatter.force_color = False
+    formatter.no_color = True
+    assert views[0].format(record) == plain
+
+
+def test_formatter_view_filters():
+    class Redact(logging.Filter):
+        def filter(self, record):
+            record.msg = record.msg.replace("secret", "***")
+            return True
+
+    formatter = colorlog.ColoredFormatter("%(message)s", force_color=True)
+    console, file = io.StringIO(), io.StringIO()
+    console_handler = logging.StreamHandler(console)
+    console_handler.setFormatter(formatter.view("colored"))
+    file_handler = logging.StreamHandler(file)
+    file_handler.setFormatter(formatter.view("plain"))
+    file_handler.addFilter(Redact())
+
+    logger = logging.getLogger("test_formatter_view_filters")
+    logger.propagate = False
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    logger.warning("password=secret")
+
+    assert console.getvalue() == "password=secret\x1b[0m\n"
+    assert file.getvalue() == "password=***\n"
+
+
+def test_formatter_view_does_not_change_record():
+    formatter = colorlog.ColoredFormatter("%(log_color)s%(message)s")
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    attributes = set(vars(record))
+    formatter.render(record)
+    assert set(vars(record)) - attributes == {"message"}
+    pickle.dumps(record)
+
+
+def test_formatter_view_fallback():
+    formatter = colorlog.ColoredFormatter("%(log_color)s%(message)s", validate=False)
+    formatter._slots = None
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    assert formatter.render(record) == "\x1b[32mhello\x1b[0m"
+    assert formatter.render(record, "plain") == "hello"
+    with pytest.raises(ValueError):
+        formatter.render(record, "bold")
+
+
+def test_format_batch():
+    formatter = colorlog.ColoredFormatter(
+        "%(asctime)s %(log_color)s%(levelname)s%(reset)s:%(message)s",
+        force_color=True,
+    )
+    records = [
+        logging.makeLogRecord({"msg": "a %s", "args": (1,), "levelname": "INFO"}),
+        logging.makeLogRecord({"msg": "b", "levelname": "ERROR"}),
+        logging.makeLogRecord({"msg": "c", "levelname": "INFO", "created": 0.5}),
+        logging.makeLogRecord({"msg": "d", "exc_info": raise_error()}),
+    ]
+    expected = [formatter.format(record) for record in records]
+    assert formatter.format_batch(records) == expected
+    assert formatter.format_batch(records, "\n") == "\n".join(expected) + "\n"
+    assert formatter.format_batch([], "\n") == ""
+
+
+def test_format_time_is_cached():
+    formatter = colorlog.ColoredFormatter("%(asctime)s %(message)s")
+    formatter.converter = time.gmtime
+    plain = logging.Formatter()
+    plain.converter = time.gmtime
+    for created in (0.25, 0.5, 1.75, 1.0):
+        record = logging.makeLogRecord(
+            {"created": created, "msecs": created % 1 * 1000}
+        )
+        assert formatter.formatTime(record) == plain.formatTime(record)
+        assert formatter.formatTime(record, "%H:%M:%S") == plain.formatTime(
+            record, "%H:%M:%S"
+        )
+    assert formatter.formatTime(record) == "1970-01-01 00:00:01,000"
+    assert formatter._time_cache[0] == 1
+
+    formatter.converter = lambda t: time.gmtime(t + 3600)
+    assert formatter.formatTime(record) == "1970-01-01 01:00:01,000"
+
+
+def test_relative_time():
+    formatter = colorlog.ColoredFormatter("%(relativeTime)s %(message)s")
+    record = logging.makeLogRecord({"msg": "hello", "relativeCreated": 1234.5678})
+    assert formatter.format(record) == "1.235 hello\x1b[0m"
+
+
+def test_column_widths():
+    formatter = colorlog.ColoredFormatter(
+        "%(levelname)s|%(message)s|", column_widths={"levelname": 6, "message": 4}
+    )
+    for levelname, msg, expected in [
+        ("INFO", "\x1b[1mab\x1b[0m", "INFO  |\x1b[1mab\x1b[0m  |"),
+        ("INFO", "日本", "INFO  |日本|"),
+        ("WARNING", "abcdef", "WARNING|abcdef|"),
+    ]:
+        record = logging.makeLogRecord({"msg": msg, "levelname": levelname})
+        assert formatter.format(record) == expected + "\x1b[0m"
+    assert ("INFO", 6) in formatter._padded
+
+    formatter.no_color = True
+    record = logging.makeLogRecord({"msg": "ab", "levelname": "INFO"})
+    assert formatter.format(record) == "INFO  |ab  |"
+
+
+class PrefixFormatter(colorlog.ColoredFormatter):
+    def formatMessage(self, record):
+        return "[sub] " + super().formatMessage(record)
+
+
+def test_format_batch_subclass():
+    formatter = PrefixFormatter("%(log_color)s%(message)s", force_color=True)
+    record = logging.makeLogRecord({"msg": "hi", "levelname": "INFO"})
+    assert formatter.format_batch([record]) == [formatter.format(record)]
+
+
+def test_formatter_view_subclass():
+    formatter = PrefixFormatter("%(log_color)s%(message)s", force_color=True)
+    record = logging.makeLogRecord({"msg": "hi", "levelname": "INFO"})
+    assert formatter.view().format(record) == formatter.format(record)
+    assert formatter.view("plain").format(record) == "[sub] hi"
+
+
+@pytest.mark.parametrize(
+    "fmt, style",
+    [("%(log_color)-3s|%(message)s", "%"), ("{log_color!s:>3}|{message}", "{")],
+)
+def test_formatter_view_escape_spec(fmt, style):
+    formatter = colorlog.ColoredFormatter(fmt, style=style, force_color=True)
+    assert formatter._slots is None
+    record = logging.makeLogRecord({"msg": "x", "levelname": "DEBUG"})
+    assert formatter.render(record) == formatter.format(record)
+
+
+def test_profile_subclass():
+    formatter = PrefixFormatter("%(log_color)s%(message)s", force_color=True)
+    record = logging.makeLogRecord({"msg": "hi", "levelname": "INFO"})
+    expected = formatter.format(record)
+    with formatter.profile() as profiler:
+        assert formatter.format(record) == expected
+    assert profiler.totals().records == 1
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="requires python3.10")
+def test_colored_record_defaults():
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    wrapper = colorlog.formatter.ColoredRecord(record, {"red": "\x1b[31m"})
+    for style, fmt in (("%", "%(red)s%(foo)s"), ("{", "{red}{foo}"), ("$", "$red$foo")):
+        formatter = logging.Formatter(fmt, style=style, defaults={"foo": "D"})
+        assert formatter.formatMessage(wrapper) == "\x1b[31mD"
+    record.foo = "E"
+    assert formatter.formatMessage(wrapper) == "\x1b[31mE"
+
+    # Formats that can't be parsed use ColoredRecord, and fail like the stdlib.
+    formatter = colorlog.ColoredFormatter(
+        "$log_color$ $foo", style="$", validate=False, defaults={"foo": "D"}
+    )
+    with pytest.raises(ValueError):
+        formatter.format(record)
@@ -1,8 +1,22 @@
 """Test the colorlog.escape_codes module."""
 
+import io
+import logging
+
 import pytest
 
-from colorlog.escape_codes import esc, escape_codes, parse_colors
+import colorlog.escape_codes
+from colorlog.escape_codes import (
+    display_width,
+    esc,
+    escape_codes,
+    parse_colors,
+    register_style,
+    set_color_depth,
+    strip_ansi,
+    strip_ansi_file,
+    strip_ansi_lines,
+)
 
 
 def test_esc():
@@ -56,3 +70,113 @@ def test_256_colors():
     for i in range(256):
         assert parse_colors("fg_%d" % i) == "\033[38;5;%dm" % i
         assert parse_colors("bg_%d" % i) == "\033[48;5;%dm" % i
+
+
+def test_parse_colors_cache():
+    parse_colors.cache_clear()
+    parse_colors("bold_red,bg_white")
+    parse_colors("bold_red,bg_white")
+    info = parse_colors.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_register_style(monkeypatch):
+    monkeypatch.setitem(escape_codes, "alert", "")
+    register_style("alert", "bold_white,bg_red")
+    assert escape_codes["alert"] == "\033[1;37m\033[41m"
+    assert parse_colors("alert,thin") == "\033[1;37m\033[41m\033[2m"
+
+
+def test_register_style_after_formatter(monkeypatch):
+    formatter = colorlog.ColoredFormatter("%(late_alert)s%(message)s")
+    plain = colorlog.ColoredFormatter("%(late_alert)s%(message)s", no_color=True)
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    monkeypatch.setitem(escape_codes, "late_alert", "")
+    register_style("late_alert", "bold_white,bg_red")
+    assert formatter.format(record) == "\033[1;37m\033[41mhello\033[0m"
+    assert formatter.render(record, "plain") == "hello"
+    assert plain.format(record) == "hello"
+
+
+def test_256_colors_are_lazy():
+    assert "fg_255" in escape_codes
+    assert "fg_256" not in escape_codes
+    assert "fg_01" not in escape_codes
+    assert escape_codes.get("bg_12") == "\033[48;5;12m"
+    assert escape_codes.get("bg_256") is None
+
+
+def test_256_colors_are_iterable():
+    assert "fg_0" in list(escape_codes)
+    assert "bg_255" in dict(escape_codes)
+    assert len(escape_codes) == len(set(escape_codes))
+
+
+@pytest.fixture()
+def color_depth():
+    """Restore the color depth after a test changes it."""
+    depth = colorlog.escape_codes.color_depth
+    yield set_color_depth
+    set_color_depth(depth)
+
+
+def test_rgb_colors(color_depth):
+    color_depth(24)
+    assert escape_codes["fg_#ff8000"] == "\033[38;2;255;128;0m"
+    assert escape_codes["bg_#FF8000"] == "\033[48;2;255;128;0m"
+    assert parse_colors("bold,rgb(255, 128, 0)") == "\033[1m\033[38;2;255;128;0m"
+    assert parse_colors("bg_rgb(0,0,0),red") == "\033[48;2;0;0;0m\033[31m"
+
+
+def test_invalid_rgb_colors():
+    assert "fg_#ff80" not in escape_codes
+    assert "fg_#gg8000" not in escape_codes
+    assert "rgb(256,0,0)" not in escape_codes
+    assert "rgb(0,0)" not in escape_codes
+
+
+def test_rgb_colors_downgrade(color_depth):
+    color_depth(8)
+    assert escape_codes["#ff8000"] == "\033[38;5;208m"
+    assert escape_codes["bg_#808080"] == "\033[48;5;244m"
+    color_depth(4)
+    assert escape_codes["#ff0000"] == "\033[91m"
+    assert escape_codes["bg_#c00000"] == "\033[41m"
+
+
+def test_strip_ansi():
+    assert strip_ansi("\033[1;31mred\033[0m \033[38;5;1mbold\033[m") == "red bold"
+    assert strip_ansi("plain") == "plain"
+
+
+def test_strip_ansi_lines():
+    lines = ["\033[31mred\033[0m\n", "plain\n"]
+    assert list(strip_ansi_lines(lines)) == ["red\n", "plain\n"]
+
+
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 1024])
+def test_strip_ansi_file(binary, chunk_size):
+    text = "\033[1;31mred\033[0m and \033[38;5;200mpink\033[0m\n\033[31"
+    expected = "red and pink\n\033[31"
+    if binary:
+        source, destination = io.BytesIO(text.encode()), io.BytesIO()
+        expected = expected.encode()
+    else:
+        source, destination = io.StringIO(text), io.StringIO()
+    strip_ansi_file(source, destination, chunk_size=chunk_size)
+    assert destination.getvalue() == expected
+
+
+@pytest.mark.parametrize(
+    "string, width",
+    [
+        ("plain", 5),
+        ("\033[31mred\033[0m", 3),
+        ("\u65e5\u672c", 4),
+        ("e\u0301", 1),
+        ("\033[1m\u00e9t\u00e9\033[0m", 3),
+    ],
+)
+def test_display_width(string, width):
+    assert display_width(string) == width
@@ -0,0 +1,323 @@
+"""Test the colorlog.handlers module."""
+
+import asyncio
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+import colorlog
+import colorlog.handlers
+
+
+def test_queue_handler_prepare():
+    handler = colorlog.handlers.QueueHandler(queue.Queue())
+    try:
+        raise RuntimeError("failed")
+    except RuntimeError:
+        record = logging.makeLogRecord(
+            {"msg": "a %s", "args": (1,), "exc_info": sys.exc_info()}
+        )
+
+    prepared = handler.prepare(record)
+    assert prepared is not record
+    assert prepared.msg == "a 1"
+    assert prepared.args is None
+    assert prepared.exc_info is None
+    assert prepared.exc_text.endswith("RuntimeError: failed")
+    assert record.args == (1,)
+
+
+class CountingStream(io.StringIO):
+    """Count how many times the stream was written to."""
+
+    writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def buffered_logger(**kwargs):
+    stream = CountingStream()
+    handler = colorlog.handlers.BufferedStreamHandler(stream, **kwargs)
+    handler.setFormatter(colorlog.ColoredFormatter("%(message)s", force_color=True))
+    logger = logging.Logger("buffered")
+    logger.addHandler(handler)
+    return logger, handler, stream
+
+
+def test_buffered_stream_handler_capacity():
+    logger, handler, stream = buffered_logger(capacity=3, flush_interval=None)
+    logger.warning("a")
+    logger.warning("b")
+    assert stream.getvalue() == ""
+    logger.warning("c")
+    assert stream.getvalue() == "a\x1b[0m\nb\x1b[0m\nc\x1b[0m\n"
+    assert stream.writes == 1
+
+
+def test_buffered_stream_handler_level():
+    logger, handler, stream = buffered_logger(flush_interval=None)
+    logger.warning("a")
+    logger.error("b")
+    assert stream.getvalue() == "a\x1b[0m\nb\x1b[0m\n"
+    assert stream.writes == 1
+
+
+def test_buffered_stream_handler_interval():
+    logger, handler, stream = buffered_logger(flush_interval=0.01)
+    logger.warning("a")
+    deadline = time.monotonic() + 5
+    while not stream.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stream.getvalue() == "a\x1b[0m\n"
+    handler.close()
+    handler._flusher.join()
+
+
+def test_buffered_stream_handler_one_thread():
+    logger, handler, stream = buffered_logger(capacity=10)
+    threads = threading.active_count()
+    for i in range(1000):
+        logger.warning("a")
+    assert threading.active_count() <= threads + 1
+    handler.close()
+
+
+class BrokenStream(io.StringIO):
+    def write(self, s):
+        raise BrokenPipeError()
+
+
+def test_buffered_stream_handler_errors():
+    handler = colorlog.handlers.BufferedStreamHandler(BrokenStream(), capacity=1)
+    errors = []
+    handler.handleError = errors.append
+    logger = logging.Logger("buffered")
+    logger.addHandler(handler)
+    logger.warning("a")
+    assert len(errors) == 1
+    assert handler.buffer == []
+
+
+def test_buffered_stream_handler_close():
+    logger, handler, stream = buffered_logger(flush_interval=None)
+    logger.warning("a")
+    handler.close()
+    assert stream.getvalue() == "a\x1b[0m\n"
+
+
+class FakeWriter:
+    """Collect the data written to an asyncio.StreamWriter."""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+
+def async_logger(**kwargs):
+    handler = colorlog.handlers.AsyncColoredStreamHandler(FakeWriter(), **kwargs)
+    handler.setFormatter(colorlog.ColoredFormatter("%(message)s", force_color=True))
+    logger = logging.Logger("async")
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_async_stream_handler():
+    async def main():
+        logger, handler = async_logger()
+        logger.warning("before start")
+        await handler.start()
+        logger.warning("a")
+        await asyncio.sleep(0)
+        logger.warning("b")
+        await handler.stop()
+        return handler.writer.data
+
+    data = asyncio.run(main())
+    assert data == b"before start\x1b[0m\na\x1b[0m\nb\x1b[0m\n"
+
+
+def test_async_stream_handler_drop():
+    async def main():
+        logger, handler = async_logger(maxsize=2)
+        await handler.start()
+        for message in "abc":
+            logger.warning(message)
+        await handler.stop()
+        return handler
+
+    handler = asyncio.run(main())
+    assert handler.writer.data == b"a\x1b[0m\nb\x1b[0m\n"
+    assert handler.dropped == 1
+
+
+def test_async_stream_handler_drop_before_format():
+    class Message:
+        renders = 0
+
+        def __str__(self):
+            self.renders += 1
+            return "m"
+
+    async def main():
+        logger, handler = async_logger(maxsize=1)
+        await handler.start()
+        logger.warning("a")
+        logger.warning(message)
+        await handler.stop()
+
+    message = Message()
+    asyncio.run(main())
+    assert message.renders == 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a pipe for stdout")
+def test_async_stream_handler_stdout(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, "stdout", os.fdopen(write_fd, "w"))
+
+    async def main():
+        handler = colorlog.handlers.AsyncColoredStreamHandler()
+        handler.setFormatter(colorlog.ColoredFormatter("%(message)s"))
+        logger = logging.Logger("async")
+        logger.addHandler(handler)
+        await handler.start()
+        assert not os.get_blocking(write_fd)
+        logger.warning("a")
+        await handler.stop()
+        assert handler.writer is None
+
+    asyncio.run(main())
+    assert os.get_blocking(write_fd)
+    sys.stdout.close()
+    with os.fdopen(read_fd, "rb") as pipe:
+        assert pipe.read() == b"a\x1b[0m\n"
+
+
+def test_async_stream_handler_block():
+    async def main():
+        logger, handler = async_logger(maxsize=2, policy="block")
+        await handler.start()
+        for message in "abc":
+            logger.warning(message)
+        await handler.stop()
+        return handler
+
+    handler = asyncio.run(main())
+    assert handler.writer.data == b"a\x1b[0m\nb\x1b[0m\nc\x1b[0m\n"
+    assert handler.dropped == 0
+
+
+def test_async_stream_handler_block_thread():
+    async def main():
+        logger, handler = async_logger(maxsize=1, policy="block")
+        await handler.start()
+        thread = threading.Thread(target=lambda: [logger.warning(m) for m in "abc"])
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+        await handler.stop()
+        return handler
+
+    handler = asyncio.run(main())
+    assert handler.writer.data == b"a\x1b[0m\nb\x1b[0m\nc\x1b[0m\n"
+
+
+def test_deduplicating_handler():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(colorlog.ColoredFormatter(force_color=True))
+    handler = colorlog.handlers.DeduplicatingHandler(target, window=10)
+    logger = logging.Logger("dedupe")
+    logger.addHandler(handler)
+
+    for i in range(5):
+        logger.warning("failed %d", i)
+    logger.error("failed %d", 0)
+    assert stream.getvalue() == (
+        "\x1b[33mWARNING:dedupe:failed 0\x1b[0m\n"
+        "\x1b[31mERROR:dedupe:failed 0\x1b[0m\n"
+    )
+
+    handler.flush()
+    assert stream.getvalue().endswith(
+        "\x1b[33mWARNING:dedupe:failed 4 (repeated 4 times)\x1b[0m\n"
+    )
+
+
+def test_deduplicating_handler_window():
+    target = logging.handlers.BufferingHandler(10)
+    handler = colorlog.handlers.DeduplicatingHandler(target, window=1)
+    for created in (0, 0.5, 0.9, 1.0, 3.0):
+        handler.handle(logging.makeLogRecord({"msg": "a", "created": created}))
+    messages = [record.getMessage() for record in target.buffer]
+    assert messages == ["a", "a (repeated 2 times)", "a", "a"]
+
+
+def test_async_stream_handler_closed_loop():
+    async def main():
+        logger, handler = async_logger()
+        await handler.start()
+        return logger, handler
+
+    logger, handler = asyncio.run(main())
+    errors = []
+    handler.handleError = errors.append
+    thread = threading.Thread(target=logger.warning, args=("after the loop",))
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_async_stream_handler_after_stop():
+    async def main():
+        logger, handler = async_logger()
+        await handler.start()
+        await handler.stop()
+        return logger, handler
+
+    logger, handler = asyncio.run(main())
+    thread = threading.Thread(target=logger.warning, args=("after stop",))
+    thread.start()
+    thread.join()
+    assert handler._loop is None
+    assert list(handler._lines) == ["after stop\x1b[0m\n"]
+
+
+class BrokenWriter(FakeWriter):
+    async def drain(self):
+        raise ConnectionResetError()
+
+
+def test_async_stream_handler_broken_writer():
+    async def main():
+        logger, handler = async_logger(maxsize=1, policy="block")
+        handler.writer = BrokenWriter()
+        errors = []
+        handler.handleError = errors.append
+        await handler.start()
+        logger.warning("a")
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=lambda: [logger.warning(m) for m in "bc"])
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+        await handler.stop()
+        return handler, errors
+
+    handler, errors = asyncio.run(main())
+    assert len(errors) == 1
+    assert handler.dropped == 2
@@ -0,0 +1,105 @@
+"""Test the colorlog.structured module."""
+
+import json
+import logging
+import re
+import sys
+
+import pytest
+
+import colorlog
+
+
+def make_record(msg="a message", **kwargs):
+    record = logging.makeLogRecord(
+        {"msg": msg, "levelname": "ERROR", "levelno": 40, "name": "example"}
+    )
+    record.__dict__.update(kwargs)
+    return record
+
+
+def test_json_formatter():
+    formatter = colorlog.JSONFormatter(
+        fields=("levelname", "name", "message", "count", "missing"), no_color=True
+    )
+    output = formatter.format(make_record('a "quoted" message', count=3))
+    assert json.loads(output) == {
+        "levelname": "ERROR",
+        "name": "example",
+        "message": 'a "quoted" message',
+        "count": 3,
+        "missing": None,
+    }
+
+
+def test_json_formatter_colors():
+    formatter = colorlog.JSONFormatter(
+        fields=("levelname", "message"),
+        field_colors={"levelname": "log_color", "message": "blue"},
+        force_color=True,
+    )
+    assert formatter.format(make_record()) == (
+        '{"levelname": \x1b[31m"ERROR"\x1b[0m, "message": \x1b[34m"a message"\x1b[0m}'
+    )
+
+
+@pytest.mark.parametrize(
+    "formatter_class", [colorlog.JSONFormatter, colorlog.LogfmtFormatter]
+)
+def test_field_colors_are_validated(formatter_class):
+    with pytest.raises(ValueError, match="messag_log_color"):
+        formatter_class(
+            field_colors={"message": "messag_log_color"},
+            secondary_log_colors={"message": {"ERROR": "red"}},
+        )
+    with pytest.raises(ValueError, match="name_log_color"):
+        formatter_class(field_colors={"name": "name_log_color"})
+
+    formatter_class(
+        field_colors={
+            "levelname": "log_color",
+            "message": "message_log_color",
+            "name": "name_log_color",
+            "asctime": "bold_blue",
+        },
+        secondary_log_colors={"message": {"ERROR": "red"}},
+        name_log_colors={"example": "cyan"},
+    )
+
+
+def test_json_formatter_exception():
+    formatter = colorlog.JSONFormatter(fields=("message",))
+    try:
+        raise RuntimeError("failed")
+    except RuntimeError:
+        record = make_record(exc_info=sys.exc_info())
+    output = json.loads(formatter.format(record))
+    assert output["message"] == "a message"
+    assert output["exc_info"].endswith("RuntimeError: failed")
+
+
+def test_logfmt_formatter():
+    formatter = colorlog.LogfmtFormatter(
+        fields=("levelname", "name", "message", "empty", "missing"), no_color=True
+    )
+    output = formatter.format(make_record('a "quoted" message', empty=""))
+    assert output == (
+        "levelname=ERROR name=example "
+        'message="a \\"quoted\\" message" empty="" missing='
+    )
+
+
+def test_logfmt_formatter_colors():
+    formatter = colorlog.LogfmtFormatter(
+        fields=("levelname", "name"),
+        field_colors={"levelname": "log_color"},
+        log_colors={"ERROR": "bold_red"},
+        force_color=True,
+    )
+    output = formatter.format(make_record())
+    assert output == "levelname=\x1b[1;31mERROR\x1b[0m name=example"
+
+
+def test_structured_formatter_time():
+    formatter = colorlog.LogfmtFormatter(fields=("asctime",), datefmt="%Y")
+    assert re.fullmatch(r"asctime=\d{4}", formatter.format(make_record()))
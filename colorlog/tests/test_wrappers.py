@@ -1,8 +1,15 @@
 """Test the colorlog.wrappers module."""
 
+import io
 import logging
+import multiprocessing
+import queue
+import sys
+
+import pytest
 
 import colorlog
+import colorlog.handlers
 
 
 def test_logging_module(test_logger):
@@ -41,3 +48,90 @@ def test_wrappers():
     assert colorlog.critical is not logging.critical
     assert colorlog.log is not logging.log
     assert colorlog.exception is not logging.exception
+
+
+def test_colorlog_basicConfig_async(reset_loggers, monkeypatch):
+    monkeypatch.setenv("FORCE_COLOR", "1")
+    stream = io.StringIO()
+    colorlog.basicConfig(async_=True, stream=stream)
+    handler = logging.root.handlers[0]
+    assert isinstance(handler, colorlog.handlers.QueueHandler)
+
+    try:
+        raise RuntimeError("failed")
+    except RuntimeError:
+        colorlog.exception("an exception message %s", 1)
+    handler.listener.stop()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0] == "\x1b[31mERROR\x1b[0m:root:an exception message 1\x1b[0m"
+    assert lines[-1] == "RuntimeError: failed"
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="requires force")
+def test_colorlog_basicConfig_async_twice(reset_loggers):
+    stream = io.StringIO()
+    colorlog.basicConfig(async_=True, stream=stream)
+    handler = logging.root.handlers[0]
+    colorlog.basicConfig(async_=True, format="%(message)s")
+    assert logging.root.handlers == [handler]
+    assert handler.listener.handlers[0].formatter._style._fmt == "%(message)s"
+
+    thread = handler.listener._thread
+    colorlog.basicConfig(async_=True, stream=stream, force=True)
+    assert not thread.is_alive()
+    assert handler.listener._thread is None
+
+    replacement = logging.root.handlers[0]
+    assert replacement is not handler
+    replacement.close()
+    assert replacement.listener._thread is None
+
+
+def log_from_worker(records, number):
+    colorlog.configure_worker(records)
+    logging.getLogger("worker").warning("message %d", number)
+
+
+def test_listener_process(capfd):
+    with colorlog.ListenerProcess(fmt="%(name)s:%(message)s") as listener:
+        workers = [
+            multiprocessing.Process(target=log_from_worker, args=(listener.queue, n))
+            for n in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    lines = capfd.readouterr().err.splitlines()
+    assert sorted(lines) == ["worker:message %d" % n for n in range(4)]
+
+
+def test_listener_stream(monkeypatch):
+    class BrokenStream(io.StringIO):
+        def write(self, text):
+            raise OSError("broken")
+
+    monkeypatch.setattr(sys, "stderr", BrokenStream())
+    records = queue.Queue()
+    records.put(logging.makeLogRecord({"msg": "a"}))
+    records.put(logging.makeLogRecord({"msg": "b"}))
+    records.put(None)
+    # Runs the listener in this process, which returns once None is received.
+    colorlog.wrappers._listen(records, {"stream": None, "fmt": "%(message)s"})
+    assert records.empty()
+
+
+def test_disabled_levels_configure(reset_loggers, capsys):
+    logging.root.setLevel(logging.WARNING)
+    colorlog.debug("a message")
+    assert len(logging.root.handlers) == 1
+    logging.root.handlers = []
+    colorlog.log(logging.INFO, "a message")
+    assert len(logging.root.handlers) == 1
+
+    logging.getLogger("other").warning("another message")
+    assert capsys.readouterr().err == (
+        "\x1b[33mWARNING\x1b[0m:other:another message\x1b[0m\n"
+    )
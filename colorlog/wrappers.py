@@ -1,7 +1,9 @@
 """Wrappers around the logging module."""
 
+import atexit
 import functools
 import logging
+import queue
 import sys
 import typing
 from logging import (
@@ -29,8 +31,10 @@ __all__ = (
     "NOTSET",
     "WARN",
     "WARNING",
+    "ListenerProcess",
     "StreamHandler",
     "basicConfig",
+    "configure_worker",
     "critical",
     "debug",
     "error",
@@ -50,13 +54,27 @@ def basicConfig(
     secondary_log_colors: typing.Optional[colorlog.formatter.SecondaryLogColors] = None,
     format: str = "%(log_color)s%(levelname)s%(reset)s:%(name)s:%(message)s",
     datefmt: typing.Optional[str] = None,
+    async_: bool = False,
     **kwargs
 ) -> None:
-    """Call ``logging.basicConfig`` and override the formatter it creates."""
+    """
+    Call ``logging.basicConfig`` and override the formatter it creates.
+
+    If ``async_`` is True, the root logger's handlers are moved behind a queue.
+    Records are formatted and written by a ``QueueListener`` thread, which is
+    stopped at exit or when the queue handler is closed (e.g. by calling
+    ``basicConfig()`` again with ``force=True``). Calling ``basicConfig()`` again
+    without ``force`` doesn't add a second queue.
+    """
     logging.basicConfig(**kwargs)
 
     def _basicConfig():
         handler = logging.root.handlers[0]
+        # If the root logger's handlers are already behind a queue, the formatter is
+        # set on the handler the listener passes records to.
+        listener = getattr(handler, "listener", None)
+        if listener is not None:
+            handler = listener.handlers[0]
         handler.setFormatter(
             colorlog.formatter.ColoredFormatter(
                 fmt=format,
@@ -68,6 +86,8 @@ def basicConfig(
                 stream=kwargs.get("stream", None),
             )
         )
+        if async_ and listener is None:
+            _enqueue_root_handlers()
 
     if sys.version_info >= (3, 13):
         with logging._lock:  # type: ignore
@@ -80,22 +100,171 @@ def basicConfig(
             logging._releaseLock()  # type: ignore
 
 
-def ensure_configured(func):
-    """Modify a function to call our basicConfig() first if no handlers exist."""
+def _enqueue_root_handlers() -> None:
+    """Replace the root logger's handlers with a queue and a listener thread."""
+    import logging.handlers
+
+    import colorlog.handlers
+
+    records: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        records, *logging.root.handlers, respect_handler_level=True
+    )
+    handler = colorlog.handlers.QueueHandler(records)
+    handler.listener = listener
+    for h in logging.root.handlers[:]:
+        logging.root.removeHandler(h)
+    logging.root.addHandler(handler)
+    listener.start()
+    atexit.register(handler.close)
+
+
+class ListenerProcess:
+    """
+    A process that formats and writes the records logged by other processes.
+
+    Worker processes send records to the listener over a queue, after calling
+    ``configure_worker(listener.queue)``. The listener is the only process that
+    writes to the terminal, and it writes whole records with each call to
+    ``write()``, so lines from different processes are never interleaved.
+
+        with colorlog.ListenerProcess() as listener:
+            with ProcessPoolExecutor(
+                initializer=colorlog.configure_worker, initargs=(listener.queue,)
+            ) as executor:
+                ...
+    """
+
+    def __init__(
+        self, context: typing.Optional[typing.Any] = None, **kwargs: typing.Any
+    ) -> None:
+        """
+        Create the queue and the (not yet started) listener process.
+
+        :Parameters:
+        - context (multiprocessing.context.BaseContext):
+            The multiprocessing context to use. Defaults to the default context.
+        (All other parameters are passed to colorlog.ColoredFormatter, and must be
+        picklable. The listener writes to its own ``sys.stderr``, which is also
+        the default ``stream`` used to decide if colors are output.)
+        """
+        # Imported here as importing multiprocessing is slow.
+        import multiprocessing
+
+        context = context or multiprocessing.get_context()
+        kwargs.setdefault(
+            "fmt", "%(log_color)s%(levelname)s%(reset)s:%(processName)s:%(message)s"
+        )
+        self.queue = context.Queue(-1)
+        self.process = context.Process(
+            target=_listen, args=(self.queue, kwargs), name="colorlog", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start the listener process, which is stopped at exit."""
+        self.process.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Write all queued records and wait for the listener process to exit."""
+        if self.process.is_alive():
+            self.queue.put(None)
+            self.process.join()
+
+    def __enter__(self) -> "ListenerProcess":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        self.stop()
+
+
+def _listen(records: typing.Any, kwargs: typing.Dict[str, typing.Any]) -> None:
+    """
+    Write records from a queue to stderr, until None is received.
+
+    All of the records waiting in the queue are formatted together and written with
+    a single call to ``write()``.
+    """
+    kwargs.setdefault("stream", sys.stderr)
+    formatter = colorlog.formatter.ColoredFormatter(**kwargs)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(formatter)
+    running = True
+    while running:
+        batch = [records.get()]
+        while len(batch) < 1000:
+            try:
+                batch.append(records.get_nowait())
+            except queue.Empty:
+                break
+        if None in batch:
+            batch = batch[: batch.index(None)]
+            running = False
+
+        try:
+            text = formatter.format_batch(batch, terminator=handler.terminator)
+        except Exception:
+            # Let the handler report the records that can't be formatted.
+            for record in batch:
+                handler.handle(record)
+        else:
+            # Keep listening if the stream fails, so that workers don't fill the queue.
+            try:
+                handler.stream.write(text)
+                handler.flush()
+            except Exception:
+                handler.handleError(
+                    logging.makeLogRecord({"msg": "Failed to write records"})
+                )
+
+
+def configure_worker(records: typing.Any, level: int = logging.DEBUG) -> None:
+    """
+    Send all records logged by this process to a ListenerProcess's queue.
+
+    Replaces the root logger's handlers, and sets the root logger's level.
+    """
+    import colorlog.handlers
+
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    logging.root.addHandler(colorlog.handlers.QueueHandler(records))
+    logging.root.setLevel(level)
+
+
+def ensure_configured(func, level=None):
+    """
+    Modify a function to call our basicConfig() first if no handlers exist.
+
+    If ``level`` is given, calls return without calling ``func`` when the root
+    logger isn't enabled for that level. The handlers are still configured, so
+    that records later logged by other loggers are colored.
+    """
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if len(logging.root.handlers) == 0:
+        if not root.handlers:
             basicConfig()
+        if level is not None and not root.isEnabledFor(level):
+            return None
         return func(*args, **kwargs)
 
     return wrapper
 
 
-debug = ensure_configured(logging.debug)
-info = ensure_configured(logging.info)
-warning = ensure_configured(logging.warning)
-error = ensure_configured(logging.error)
-critical = ensure_configured(logging.critical)
-log = ensure_configured(logging.log)
-exception = ensure_configured(logging.exception)
+debug = ensure_configured(logging.debug, DEBUG)
+info = ensure_configured(logging.info, INFO)
+warning = ensure_configured(logging.warning, WARNING)
+error = ensure_configured(logging.error, ERROR)
+critical = ensure_configured(logging.critical, CRITICAL)
+exception = ensure_configured(logging.exception, ERROR)
+
+
+@functools.wraps(logging.log)
+def log(level, msg, *args, **kwargs):
+    if not root.handlers:
+        basicConfig()
+    if isinstance(level, int) and not root.isEnabledFor(level):
+        return None
+    return logging.log(level, msg, *args, **kwargs)